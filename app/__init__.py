@@ -1,30 +1,21 @@
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from logging.handlers import SMTPHandler
-import firebase_admin
-from firebase_admin import credentials
 from flask import Flask
 from flask import jsonify
-from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flasgger import Swagger
-from flasgger import APISpec
-from apispec.ext.marshmallow import MarshmallowPlugin
-from apispec_webframeworks.flask import FlaskPlugin
-from app.docs.schemas import GeneratedTokensResponseSchema, GgUserProfileResponseSchema
-from app.docs.schemas import FbUserProfileResponseSchema
-from app.docs.schemas import LikeResponseSchema
+from sqlalchemy.engine import make_url
+from app.db_routing import RoutingSQLAlchemy
 from app.utils.errors import error_response
 from app.utils import http_responses
 from app.utils.logging.formatters import RequestFormatter
 from config import Config
 
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 ma = Marshmallow()
 migrate = Migrate()
 jwt = JWTManager()
@@ -37,19 +28,51 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
 
     _init_extensions(app)
+    _init_db_routing(app)
     _init_error_handler(app)
     _init_blueprint(app)
+    _init_commands(app)
     _init_logging(app)
-    _init_db(app)
     _init_docs(app)
+    _init_feed_buffer(app)
+    _init_like_buffer(app)
+    _init_user_cache(app)
+    _init_services(app)
+    _init_purge(app)
 
     return app
 
 
-def _init_db(app):
-    @app.before_first_request
-    def init_db():
-        db.create_all()
+def _init_db_routing(app):
+    from app import db_routing
+    db_routing.init_app(app)
+
+
+def _init_feed_buffer(app):
+    from app.feed_buffer import feed_buffer
+    feed_buffer.init_app(app)
+
+
+def _init_like_buffer(app):
+    from app.like_buffer import like_buffer
+    like_buffer.init_app(app)
+
+
+def _init_user_cache(app):
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
+
+
+def _init_services(app):
+    from app.services import circuit_breaker
+    from app.services import google_auth
+    circuit_breaker.init_app(app)
+    google_auth.init_app(app)
+
+
+def _init_purge(app):
+    from app.purge import purger
+    purger.init_app(app)
 
 
 def _init_blueprint(app):
@@ -57,6 +80,11 @@ def _init_blueprint(app):
     app.register_blueprint(api_bp, url_prefix=f"/api/{ver}")
 
 
+def _init_commands(app):
+    from app.commands import bp as commands_bp
+    app.register_blueprint(commands_bp)
+
+
 def _init_error_handler(app):
     @app.errorhandler(404)
     def handle_url_not_found(e):
@@ -69,23 +97,62 @@ def _init_error_handler(app):
 
     @app.errorhandler(Exception)
     def handle_internal_error(e):
-        print(e)
         app.logger.error(e)
         return http_responses.internal_server_error(jsonify(error_response("An unexpected error has occurred")))
 
 
 def _init_extensions(app):
-    cred = credentials.Certificate(app.config["FIREBASE_SDK_KEY"])
-    firebase_admin.initialize_app(cred)
-    
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    # Browsers only let clients read the response headers that are exposed
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor", "ETag"])
+    _init_engine_options(app)
     db.init_app(app)
     migrate.init_app(app, db)
     ma.init_app(app)
     jwt.init_app(app)
 
 
+def _init_engine_options(app):
+    from app import db_pool
+
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = dict(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+
+    if url.get_backend_name() == "sqlite":
+        for option in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+            options.pop(option, None)
+    else:
+        options.setdefault("poolclass", db_pool.InstrumentedQueuePool)
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = _with_driver(app, url)
+    if app.config["DATABASE_REPLICA_URL"]:
+        # The replica bind shares the engine options, so it has to be the same kind of database
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds["replica"] = _with_driver(app, make_url(app.config["DATABASE_REPLICA_URL"]))
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    db_pool.init_app(app)
+
+
+def _with_driver(app, url):
+    if url.get_backend_name() == "mysql" and app.config["DATABASE_DRIVER"]:
+        url = url.set(drivername=f"mysql+{app.config['DATABASE_DRIVER']}")
+    return url.render_as_string(hide_password=False)
+
+
 def _init_docs(app):
+    from app.docs.swagger import LazySwagger
+    LazySwagger(app, template_factory=_docs_template)
+
+
+def _docs_template(app):
+    from flasgger import APISpec
+    from apispec.ext.marshmallow import MarshmallowPlugin
+    from apispec_webframeworks.flask import FlaskPlugin
+    from app.docs.schemas import GeneratedTokensResponseSchema, GgUserProfileResponseSchema
+    from app.docs.schemas import FbUserProfileResponseSchema
+    from app.docs.schemas import LikeResponseSchema
+
     spec = APISpec(
         title="Blog GotIt APIDocs",
         version="1.0",
@@ -105,15 +172,21 @@ def _init_docs(app):
         "API Documentation for Blog GotIt Backend" + \
         "<style>.models {display: none !important}</style>" + \
         "<style>.topbar {display: none !important}</style>"
-    Swagger(app, template=template)
+    return template
 
 
 def _init_logging(app):
     if not app.debug and not app.testing:
+        from flask.logging import default_handler
+        from app.utils.logging.handlers import DigestSMTPHandler
+        from app.utils.logging.handlers import queue_handler
+
         formatter = RequestFormatter(
             '[%(asctime)s] %(remote_addr)s requested %(url)s\n'
             '%(levelname)s in %(module)s: %(message)s'
         )
+        # Every handler runs on the queue's listener thread, never in a request
+        handlers = [default_handler]
 
         if app.config["MAIL_SERVER"]:
             auth = None
@@ -122,26 +195,34 @@ def _init_logging(app):
             secure = None
             if app.config["MAIL_USE_TLS"]:
                 secure = ()
-            mail_handler = SMTPHandler(
+            mail_handler = DigestSMTPHandler(
                 mailhost=(app.config["MAIL_SERVER"], app.config["MAIL_PORT"]),
                 fromaddr=f"no-reply@{app.config['MAIL_SERVER']}",
                 toaddrs=app.config["ADMINS"],
                 subject="Blog Failure",
                 credentials=auth,
-                secure=secure)
+                secure=secure,
+                interval=app.config["MAIL_DIGEST_INTERVAL"],
+                max_records=app.config["MAIL_DIGEST_MAX_RECORDS"])
             mail_handler.setLevel(logging.ERROR)
             mail_handler.setFormatter(formatter)
-            app.logger.addHandler(mail_handler)
+            handlers.append(mail_handler)
 
         if not os.path.exists("logs"):
             os.mkdir("logs")
         
-        file_handler = RotatingFileHandler("logs/server.log", maxBytes=10240, backupCount=10)
+        file_handler = RotatingFileHandler(
+            "logs/server.log",
+            maxBytes=app.config["LOG_FILE_MAX_BYTES"],
+            backupCount=app.config["LOG_FILE_BACKUP_COUNT"]
+        )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+        app.logger.removeHandler(default_handler)
+        app.logger.addHandler(queue_handler(handlers, app.config["LOG_QUEUE_SIZE"]))
         app.logger.setLevel(logging.INFO)
         app.logger.info("Server Startup")
 
-
 from app import models
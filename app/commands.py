@@ -0,0 +1,106 @@
+import time
+import click
+from flask import Blueprint
+from flask import current_app
+from sqlalchemy import bindparam
+from sqlalchemy.exc import OperationalError
+from app import db
+from app import counters
+from app import exports
+from app.purge import purger
+from app.models import Post
+from app.models import User
+from app.utils.string_manipulation import truncate_string
+
+
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+def _post_id_batches(batch_size):
+    last_id = 0
+    while True:
+        post_ids = [post_id for (post_id,) in db.session.query(Post.id)
+                                                        .filter(Post.id > last_id)
+                                                        .order_by(Post.id)
+                                                        .limit(batch_size)]
+        if not post_ids:
+            return
+        yield post_ids
+        last_id = post_ids[-1]
+
+
+@bp.cli.command("wait-for-db")
+@click.option("--attempts", default=20, show_default=True, help="Connection attempts before giving up")
+@click.option("--interval", default=3.0, show_default=True, help="Seconds between attempts")
+def wait_for_db(attempts, interval):
+    """Wait until the database accepts connections, failing after a number of attempts."""
+    for attempt in range(1, attempts + 1):
+        try:
+            with db.engine.connect():
+                return
+        except OperationalError as e:
+            if attempt == attempts:
+                raise click.ClickException(f"Database still unreachable after {attempts} attempts: {e.orig}")
+            click.echo(f"Database not ready, retrying in {interval:g} seconds", err=True)
+            time.sleep(interval)
+
+
+@bp.cli.command("reconcile-like-counts")
+@click.option("--batch-size", default=1000, show_default=True, help="Number of posts checked per transaction")
+def reconcile_like_counts(batch_size):
+    """Recompute posts' like counters from the like table and fix drift."""
+    checked = drifted = 0
+    for post_ids in _post_id_batches(batch_size):
+        drifted += counters.reconcile(post_ids)
+        db.session.commit()
+        checked += len(post_ids)
+
+    click.echo(f"Checked {checked} posts, fixed {drifted} drifted like counts")
+
+
+@bp.cli.command("recompute-overviews")
+@click.option("--batch-size", default=1000, show_default=True, help="Number of posts rewritten per transaction")
+def recompute_overviews(batch_size):
+    """Recompute posts' body overviews, e.g. after BODY_OVERVIEW_LENGTH changed."""
+    length = current_app.config["BODY_OVERVIEW_LENGTH"]
+    post_table = Post.__table__
+    stmt = post_table.update()\
+                     .where(post_table.c.id == bindparam("post_id"))\
+                     .values(overview=bindparam("new_overview"), version=post_table.c.version + 1)
+
+    checked = rewritten = 0
+    for post_ids in _post_id_batches(batch_size):
+        rows = db.session.query(Post.id, Post.author_id, Post.body, Post.overview).filter(Post.id.in_(post_ids)).all()
+        changes = [
+            {"post_id": post_id, "new_overview": truncate_string(body, length)}
+            for post_id, _, body, overview in rows
+            if truncate_string(body, length) != overview
+        ]
+        if changes:
+            db.session.execute(stmt, changes)
+            # Profiles list the overviews of their authors' posts
+            changed = {change["post_id"] for change in changes}
+            User.bump_content_version({author_id for post_id, author_id, _, _ in rows if post_id in changed})
+        db.session.commit()
+        checked += len(post_ids)
+        rewritten += len(changes)
+
+    click.echo(f"Checked {checked} posts, rewrote {rewritten} overviews")
+
+
+@bp.cli.command("purge-deleted")
+def purge_deleted():
+    """Purge deleted posts and accounts now rather than in the background."""
+    purged = purger.purge_all()
+    if purged is None:
+        raise click.ClickException("Another worker is purging, try again later")
+    click.echo(f"Purged {purged} accounts, {purger.posts} posts and {purger.likes} likes")
+
+
+@bp.cli.command("export")
+@click.option("--since", type=click.DateTime(), help="Only export posts and likes created at or after this time")
+@click.option("--output", type=click.File("w"), default="-", show_default=True, help="File to write to")
+def export(since, output):
+    """Export all posts and likes as newline-delimited JSON."""
+    for line in exports.export_lines(since):
+        output.write(line)
@@ -0,0 +1,83 @@
+import random
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Like
+from app.models import PostLikeCounter
+
+
+counter_table = PostLikeCounter.__table__
+
+
+def _add_to_slot(post_id, slot, delta):
+    # A single upsert, so concurrent first likes of a post can't deadlock creating the same slot
+    values = {"post_id": post_id, "slot": slot, "count": delta, "changes": 1}
+    increments = {"count": counter_table.c.count + delta, "changes": counter_table.c.changes + 1}
+    if db.engine.dialect.name == "mysql":
+        stmt = mysql_insert(counter_table).values(values).on_duplicate_key_update(increments)
+    else:
+        stmt = sqlite_insert(counter_table).values(values)\
+            .on_conflict_do_update(index_elements=[counter_table.c.post_id, counter_table.c.slot], set_=increments)
+    db.session.execute(stmt)
+
+
+def add_likes(post_id, delta):
+    """Add ``delta`` to one random counter slot of the post, inside the caller's transaction"""
+    _add_to_slot(post_id, random.randrange(current_app.config["LIKE_COUNTER_SLOTS"]), delta)
+
+
+def like_totals(post_ids):
+    """Map post ids to their like count by summing their counter slots"""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+
+    rows = db.session.query(PostLikeCounter.post_id, func.sum(PostLikeCounter.count))\
+                     .filter(PostLikeCounter.post_id.in_(post_ids))\
+                     .group_by(PostLikeCounter.post_id)
+    return {post_id: int(total) for post_id, total in rows}
+
+
+def like_changes(*criteria):
+    """Scalar subquery summing the change tokens of the counter slots matching ``criteria``"""
+    return select(func.coalesce(func.sum(PostLikeCounter.changes), 0)).where(*criteria).scalar_subquery()
+
+
+def touch_liked_by(user_id):
+    """Change the like-state token of every post the user likes, so ETags listing the user as a liker change.
+
+    Every liked post has a counter slot already, the like itself added to one.
+    """
+    db.session.execute(
+        counter_table.update()
+            .where(counter_table.c.post_id.in_(select(Like.post_id).where(Like.user_id == user_id)))
+            .values(changes=counter_table.c.changes + 1)
+    )
+
+
+def reconcile(post_ids):
+    """Correct the counters of the given posts against the like table and return how many drifted.
+
+    Corrections are applied as deltas, so likes committed concurrently are not lost.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return 0
+
+    actual = dict(
+        db.session.query(Like.post_id, func.count())
+                  .filter(Like.post_id.in_(post_ids))
+                  .group_by(Like.post_id)
+    )
+    counted = like_totals(post_ids)
+
+    drifted = 0
+    for post_id in post_ids:
+        delta = actual.get(post_id, 0) - counted.get(post_id, 0)
+        if delta:
+            _add_to_slot(post_id, 0, delta)
+            drifted += 1
+    return drifted
@@ -0,0 +1,87 @@
+import threading
+import time
+from weakref import WeakKeyDictionary
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+from app import db
+from app.utils import metrics
+
+
+_lock = threading.Lock()
+_counts = WeakKeyDictionary()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long ``connect()`` waits for a connection.
+
+    Pool events only fire once a connection is handed out, so they can't see the wait. The
+    timings are kept across ``recreate()``, which disposing of the engine calls.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = {"timeouts": 0, "wait_seconds": 0, "wait_seconds_max": 0}
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.waits = self.waits
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except TimeoutError:
+            with _lock:
+                self.waits["timeouts"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with _lock:
+                self.waits["wait_seconds"] += elapsed
+                self.waits["wait_seconds_max"] = max(self.waits["wait_seconds_max"], elapsed)
+
+
+def instrument(engine):
+    """Count the new connections, checkouts, checkins and invalidations of the engine's pool"""
+    counts = _counts[engine] = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidated": 0}
+
+    def counter(name):
+        def count(*args):
+            with _lock:
+                counts[name] += 1
+        return count
+
+    event.listen(engine, "connect", counter("connects"))
+    event.listen(engine, "checkout", counter("checkouts"))
+    event.listen(engine, "checkin", counter("checkins"))
+    event.listen(engine, "invalidate", counter("invalidated"))
+
+
+def engine_stats(engine):
+    pool = engine.pool
+    with _lock:
+        snapshot = dict(_counts.get(engine, {}), pool=type(pool).__name__)
+        if isinstance(pool, InstrumentedQueuePool):
+            snapshot.update(
+                timeouts=pool.waits["timeouts"],
+                wait_seconds=round(pool.waits["wait_seconds"], 6),
+                wait_seconds_max=round(pool.waits["wait_seconds_max"], 6)
+            )
+    if isinstance(pool, QueuePool):
+        snapshot.update(size=pool.size(), in_use=pool.checkedout(), idle=pool.checkedin(), overflow=max(pool.overflow(), 0))
+    return snapshot
+
+
+def stats():
+    """Stats of the primary's pool and of every bind's, such as the replica's"""
+    snapshot = {"primary": engine_stats(db.get_engine())}
+    for bind in current_app.config.get("SQLALCHEMY_BINDS") or {}:
+        snapshot[bind] = engine_stats(db.get_engine(bind=bind))
+    return snapshot
+
+
+def init_app(app):
+    metrics.register("db_pool", stats)
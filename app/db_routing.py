@@ -0,0 +1,138 @@
+import threading
+from cachetools import TTLCache
+from flask import g
+from flask import has_request_context
+from flask import request
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SignallingSession
+from flask_sqlalchemy import get_state
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.dml import UpdateBase
+from app.utils import metrics
+
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+REPLICA = "replica"
+
+_lock = threading.Lock()
+_writers = None
+_stats = {"replica_requests": 0, "primary_requests": 0, "sticky_requests": 0, "fallbacks": 0}
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends the reads of read-only requests to the ``replica`` bind.
+
+    Flushes and DML statements always go to the primary, as does everything outside a request.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and not isinstance(clause, UpdateBase) and reading_from_replica():
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        from app import db_pool
+
+        # Every engine, the replica's included, reports the stats of its pool
+        engine = super().create_engine(sa_url, engine_opts)
+        db_pool.instrument(engine)
+        return engine
+
+
+def reading_from_replica():
+    """Return whether the current request reads from the replica"""
+    return has_request_context() and g.get("db_replica", False)
+
+
+def use_primary():
+    """Send the rest of the current request's reads to the primary"""
+    if has_request_context():
+        g.db_replica = False
+
+
+def route_user(user_id):
+    """Keep the requests of a user who wrote within ``REPLICA_STICKY_SECONDS`` on the primary"""
+    g.db_user_id = user_id
+    if _writers is not None and g.get("db_replica", False):
+        with _lock:
+            sticky = user_id in _writers
+        if sticky:
+            g.db_replica = False
+            g.db_sticky = True
+
+
+def fell_back():
+    """Count a read that missed on the replica and was retried on the primary"""
+    _stats["fallbacks"] += 1
+
+
+def stats():
+    return dict(_stats, sticky_users=len(_writers) if _writers is not None else 0)
+
+
+def init_app(app):
+    global _writers
+
+    has_replica = REPLICA in (app.config["SQLALCHEMY_BINDS"] or {})
+    if has_replica and app.config["REPLICA_STICKY_SECONDS"]:
+        _writers = TTLCache(maxsize=app.config["REPLICA_STICKY_SIZE"], ttl=app.config["REPLICA_STICKY_SECONDS"])
+
+    @app.before_request
+    def route_request():
+        g.db_read_only = request.method in READ_METHODS
+        g.db_replica = has_replica and g.db_read_only
+
+    @app.after_request
+    def count_request(response):
+        if g.get("db_read_only"):
+            if g.get("db_replica"):
+                _stats["replica_requests"] += 1
+            else:
+                _stats["primary_requests"] += 1
+                if g.get("db_sticky"):
+                    _stats["sticky_requests"] += 1
+        return response
+
+    metrics.register("db_routing", stats)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session):
+    if _writers is not None and has_request_context() and g.get("db_user_id") is not None:
+        with _lock:
+            _writers[g.db_user_id] = True
+
+
+@event.listens_for(Engine, "begin")
+def _begin_read_only(conn):
+    if not has_request_context() or not g.get("db_read_only"):
+        return
+
+    # Issued on the DBAPI connection, ahead of the statement that opens the transaction
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.name == "sqlite":
+            cursor.execute("PRAGMA query_only = ON")
+            conn.info["query_only"] = True
+        else:
+            cursor.execute("SET TRANSACTION READ ONLY")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "commit")
+@event.listens_for(Engine, "rollback")
+def _end_read_only(conn):
+    if conn.info.pop("query_only", False):
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only = OFF")
+        finally:
+            cursor.close()
@@ -29,6 +29,7 @@ class PostResponseSchema(Schema):
     created_at = fields.DateTime()
     author = fields.Nested(UserResponseSchema)
     likes = fields.Nested(OverallLikeResponseSchema)
+    liked_by_me = fields.Bool()
 
 
 class FbUserProfileResponseSchema(Schema):
@@ -36,6 +37,7 @@ class FbUserProfileResponseSchema(Schema):
     name = fields.Str()
     phone = fields.Str()
     posts = fields.Nested(PostResponseSchema, many=True)
+    next_cursor = fields.Str()
 
 
 class GgUserProfileResponseSchema(Schema):
@@ -43,3 +45,4 @@ class GgUserProfileResponseSchema(Schema):
     name = fields.Str()
     occupation = fields.Str()
     posts = fields.Nested(PostResponseSchema, many=True)
+    next_cursor = fields.Str()
@@ -0,0 +1,38 @@
+import threading
+from flask import current_app
+from flask import jsonify
+from flasgger import Swagger
+
+
+class LazySwagger(Swagger):
+    """Swagger that builds its template on the first request for the docs instead of at startup.
+
+    Each spec is generated and serialized once, then served as is, since the resource docstrings
+    don't change while the app runs.
+    """
+
+    def __init__(self, app=None, template_factory=None, **kwargs):
+        self._template_factory = template_factory
+        self._lock = threading.Lock()
+        self._specs = {}
+        super().__init__(app, **kwargs)
+
+    def register_views(self, app):
+        super().register_views(app)
+        blueprint = self.config.get("endpoint", "flasgger")
+        for endpoint in self.endpoints:
+            app.view_functions[f"{blueprint}.{endpoint}"] = self._spec_view(endpoint)
+
+    def _spec_view(self, endpoint):
+        def spec():
+            return self.spec_response(endpoint)
+        return spec
+
+    def spec_response(self, endpoint):
+        with self._lock:
+            spec = self._specs.get(endpoint)
+            if spec is None:
+                if self.template is None and self._template_factory is not None:
+                    self.template = self._template_factory(current_app._get_current_object())
+                spec = self._specs[endpoint] = jsonify(self.get_apispecs(endpoint)).get_data()
+        return current_app.response_class(spec, mimetype="application/json")
@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime
+from app.models import Post
+from app.schemas import PostListSchema
+from app.utils import metrics
+from app.utils.pagination import decode_cursor
+from app.utils.pagination import encode_cursor
+
+
+def _key(post):
+    return post.created_at, post.id
+
+
+class FeedBuffer:
+    """Write-through buffer of this worker's newest serialized posts, newest first.
+
+    The buffer is warmed by the first feed read, so workers and CLI commands start
+    without querying the posts. Posts written by this worker are applied immediately.
+    Writes made by other workers show up when the buffer is re-warmed, at most
+    ``FEED_BUFFER_TTL`` seconds later.
+    """
+
+    def __init__(self):
+        self.capacity = 0
+        self.ttl = 0
+        self._lock = threading.Lock()
+        self._entries = []
+        self._dirty = set()
+        self._complete = False
+        self._warmed_at = None
+        self.hits = 0
+        self.misses = 0
+        self.warms = 0
+
+    def init_app(self, app):
+        self.capacity = app.config["FEED_BUFFER_SIZE"]
+        self.ttl = app.config["FEED_BUFFER_TTL"]
+        metrics.register("feed_buffer", self.stats)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "warms": self.warms
+        }
+
+    def warm(self):
+        posts = Post.query\
+                    .filter(Post.visible())\
+                    .order_by(Post.created_at.desc(), Post.id.desc())\
+                    .limit(self.capacity)\
+                    .all()
+        entries = [(_key(post), item) for post, item in zip(posts, PostListSchema(many=True).dump(posts))]
+
+        with self._lock:
+            self._entries = entries
+            self._dirty = set()
+            self._complete = len(entries) < self.capacity
+            self._warmed_at = time.monotonic()
+            self.warms += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._warmed_at = None
+
+    def put(self, post):
+        """Insert or replace a post that was just created or updated"""
+        if not self.capacity:
+            return
+
+        key, item = _key(post), PostListSchema().dump(post)
+        with self._lock:
+            entries = [entry for entry in self._entries if entry[0][1] != post.id]
+            index = next((i for i, entry in enumerate(entries) if entry[0] < key), len(entries))
+            if index < len(entries) or self._complete:
+                entries.insert(index, (key, item))
+            if len(entries) > self.capacity:
+                entries.pop()
+                self._complete = False
+            self._entries = entries
+            self._dirty.discard(post.id)
+
+    def remove(self, post_id):
+        with self._lock:
+            self._entries = [entry for entry in self._entries if entry[0][1] != post_id]
+            self._dirty.discard(post_id)
+
+    def touch(self, post_id):
+        """Mark a post's likes as changed, it is re-serialized on its next read"""
+        with self._lock:
+            if any(entry[0][1] == post_id for entry in self._entries):
+                self._dirty.add(post_id)
+
+    def page_at(self, page, per_page):
+        """Return the items of a ``?page=`` page, or ``None`` if it isn't fully buffered"""
+        return self._page(per_page, offset=max(page - 1, 0) * per_page)
+
+    def page_after(self, cursor, per_page):
+        """Return the items and next cursor of a ``?cursor=`` page, or ``None`` if it isn't fully buffered"""
+        # Cursors of other orderings, like search's (score, id), can't be compared with the keys
+        after = tuple(decode_cursor(cursor, (datetime, int))) if cursor else None
+
+        return self._page(per_page, after=after)
+
+    def _page(self, per_page, offset=0, after=None):
+        if not self.capacity:
+            return None
+
+        if self._warmed_at is None or time.monotonic() - self._warmed_at > self.ttl:
+            self.warm()
+
+        with self._lock:
+            entries = self._entries
+            if after is not None:
+                offset = next((i for i, (key, _) in enumerate(entries) if key < after), len(entries))
+            end = offset + per_page
+
+            # One entry past the page is needed to know whether there is a next page
+            if end >= len(entries) and not self._complete:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            page = entries[offset:end]
+            has_next = end < len(entries)
+            dirty = [key[1] for key, _ in page if key[1] in self._dirty]
+
+        if dirty:
+            page = self._refresh(page, dirty)
+
+        next_cursor = encode_cursor(page[-1][0]) if has_next and page else None
+        return [item for _, item in page], next_cursor
+
+    def _refresh(self, page, post_ids):
+        posts = Post.query.filter(Post.id.in_(post_ids), Post.visible()).all()
+        items = {post.id: item for post, item in zip(posts, PostListSchema(many=True).dump(posts))}
+
+        with self._lock:
+            self._entries = [
+                (key, items[key[1]]) if key[1] in items else (key, item)
+                for key, item in self._entries
+                if key[1] not in post_ids or key[1] in items
+            ]
+            self._dirty.difference_update(post_ids)
+
+        return [(key, items.get(key[1], item)) for key, item in page if key[1] not in post_ids or key[1] in items]
+
+
+feed_buffer = FeedBuffer()
@@ -0,0 +1,203 @@
+import atexit
+import threading
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import and_
+from sqlalchemy import exists
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app import counters
+from app import like_store
+from app.feed_buffer import feed_buffer
+from app.models import Like
+from app.models import Post
+from app.utils import metrics
+
+
+class LikeBuffer:
+    """Write-behind buffer of this worker's likes and unlikes, flushed with one commit per batch.
+
+    Pending changes are keyed by ``(post_id, user_id)`` and hold the stored state next to the
+    wanted one, so a like followed by an unlike collapses to nothing. The batch is flushed every
+    ``LIKE_BUFFER_FLUSH_INTERVAL`` milliseconds, as soon as ``LIKE_BUFFER_MAX_EVENTS`` changes are
+    pending, and on shutdown. Like totals catch up with the buffered changes when they are flushed.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.interval = 0
+        self.max_events = 0
+        self._app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pending = {}
+        self._flushing = {}
+        self.events = 0
+        self.collapsed = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        self.enabled = app.config["LIKE_BUFFER_ENABLED"]
+        self.interval = app.config["LIKE_BUFFER_FLUSH_INTERVAL"] / 1000
+        self.max_events = app.config["LIKE_BUFFER_MAX_EVENTS"]
+        self._app = app
+        metrics.register("like_buffer", self.stats)
+
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "events": self.events,
+            "collapsed": self.collapsed,
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failures": self.failures
+        }
+
+    def like(self, post_id, user_id):
+        """Buffer a like and return the same outcomes as ``like_store.like``"""
+        stored = self._stored_state(post_id, user_id)
+        if stored is None:
+            return like_store.POST_NOT_FOUND
+
+        if not self._record((post_id, user_id), stored, True):
+            return like_store.ALREADY_LIKED
+        return like_store.CREATED
+
+    def unlike(self, post_id, user_id):
+        """Buffer an unlike and return whether the post was liked"""
+        stored = self._stored_state(post_id, user_id)
+        return stored is not None and self._record((post_id, user_id), stored, False)
+
+    def is_liked(self, post_id, user_id):
+        """Return the buffered state of a like, or ``None`` if it has no unwritten change"""
+        key = (post_id, user_id)
+        entry = self._pending.get(key) or self._flushing.get(key)
+        return entry[1] if entry else None
+
+    def _stored_state(self, post_id, user_id):
+        """Return whether the like is stored, or ``None`` if the post doesn't exist or is hidden.
+
+        Changes being flushed count as stored, and pending ones know the stored state already,
+        both spare the lookup.
+        """
+        key = (post_id, user_id)
+        entry = self._pending.get(key)
+        if entry is not None:
+            return entry[0]
+        entry = self._flushing.get(key)
+        if entry is not None:
+            return entry[1]
+
+        row = db.session.query(
+            Post.id,
+            exists().where(and_(Like.post_id == Post.id, Like.user_id == user_id))
+        ).filter(Post.id == post_id, Post.visible()).first()
+        return None if row is None else row[1]
+
+    def _record(self, key, stored, liked):
+        with self._lock:
+            # A concurrent request may have changed the state since it was read
+            stored, current = self._pending.get(key, (stored, stored))
+            if current == liked:
+                return False
+
+            if stored == liked:
+                del self._pending[key]
+                self.collapsed += 1
+            else:
+                self._pending[key] = (stored, liked)
+            self.events += 1
+            full = len(self._pending) >= self.max_events
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _ensure_thread(self):
+        # Started lazily so that it runs in the worker process rather than a pre-fork parent
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="like-buffer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending change to the like table in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            if not batch:
+                return
+
+            with self._app.app_context():
+                try:
+                    self._write(batch)
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    self._requeue(batch)
+                    self.failures += 1
+                    self._app.logger.error(f"Like buffer flush failed: {e}")
+                    return
+                finally:
+                    self._flushing = {}
+                    db.session.remove()
+
+            self.flushes += 1
+            self.flushed += len(batch)
+            for post_id in {post_id for post_id, _ in batch}:
+                feed_buffer.touch(post_id)
+
+    def _write(self, batch):
+        likes = [{"post_id": post_id, "user_id": user_id} for (post_id, user_id), (_, liked) in batch.items() if liked]
+        unlikes = [{"post_id": post_id, "user_id": user_id} for (post_id, user_id), (_, liked) in batch.items() if not liked]
+        now = datetime.utcnow()
+        for params in likes:
+            params["liked_at"] = now
+
+        written = 0
+        if likes:
+            written += db.session.execute(like_store.insert_like, likes).rowcount
+        if unlikes:
+            written += db.session.execute(like_store.delete_like, unlikes).rowcount
+
+        deltas = Counter()
+        for (post_id, _), (_, liked) in batch.items():
+            deltas[post_id] += 1 if liked else -1
+
+        if written == len(batch):
+            for post_id, delta in deltas.items():
+                if delta:
+                    counters.add_likes(post_id, delta)
+        else:
+            # Another worker or a deleted post got in the way, count the likes instead
+            counters.reconcile(deltas)
+        db.session.commit()
+
+    def _requeue(self, batch):
+        with self._lock:
+            for key, (stored, liked) in batch.items():
+                # Changes recorded during the failed flush took its batch as stored
+                liked = self._pending.get(key, (None, liked))[1]
+                if liked == stored:
+                    self._pending.pop(key, None)
+                else:
+                    self._pending[key] = (stored, liked)
+
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,58 @@
+from datetime import datetime
+from sqlalchemy import bindparam
+from sqlalchemy import exists
+from sqlalchemy import select
+from app import db
+from app.models import Like
+from app.models import Post
+from app.models import User
+
+
+CREATED = "created"
+ALREADY_LIKED = "already_liked"
+POST_NOT_FOUND = "post_not_found"
+
+like_table = Like.__table__
+post_table = Post.__table__
+user_table = User.__table__
+
+# Selecting from post makes a missing or hidden post, or a missing user, insert nothing instead of
+# failing a foreign key, and IGNORE makes an existing like insert nothing instead of failing the primary key
+insert_like = like_table.insert()\
+    .from_select(
+        ["post_id", "user_id", "liked_at"],
+        select(
+            post_table.c.id,
+            bindparam("user_id", type_=like_table.c.user_id.type),
+            bindparam("liked_at", type_=like_table.c.liked_at.type)
+        ).where(
+            post_table.c.id == bindparam("post_id"),
+            Post.visible(),
+            exists().where(user_table.c.id == bindparam("user_id"))
+        )
+    )\
+    .prefix_with("IGNORE", dialect="mysql")\
+    .prefix_with("OR IGNORE", dialect="sqlite")
+
+delete_like = like_table.delete()\
+    .where(like_table.c.post_id == bindparam("post_id"), like_table.c.user_id == bindparam("user_id"))
+
+
+def like(post_id, user_id):
+    """Like a post with a single INSERT, inside the caller's transaction.
+
+    Returns ``CREATED``, ``ALREADY_LIKED`` or ``POST_NOT_FOUND``. Only the last two, which insert
+    nothing, pay for a second lookup to tell them apart.
+    """
+    params = {"post_id": post_id, "user_id": user_id, "liked_at": datetime.utcnow()}
+    if db.session.execute(insert_like, params).rowcount:
+        return CREATED
+
+    if db.session.query(Post.id).filter(Post.id == post_id, Post.visible()).first() is None:
+        return POST_NOT_FOUND
+    return ALREADY_LIKED
+
+
+def unlike(post_id, user_id):
+    """Unlike a post with a single DELETE, inside the caller's transaction, and return whether it was liked"""
+    return db.session.execute(delete_like, {"post_id": post_id, "user_id": user_id}).rowcount > 0
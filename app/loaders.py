@@ -0,0 +1,76 @@
+from sqlalchemy import func
+from sqlalchemy.orm.util import identity_key
+from app import db
+from app.models import Like
+from app.models import User
+
+
+def users_by_id(user_ids):
+    """Map user ids to users, fetching the ones not already in the session with a single IN query"""
+    users = {}
+    missing = set()
+    for user_id in set(user_ids):
+        user = db.session.identity_map.get(identity_key(User, user_id))
+        if user is None:
+            missing.add(user_id)
+        else:
+            users[user_id] = user
+
+    if missing:
+        users.update((user.id, user) for user in User.query.filter(User.id.in_(missing)))
+
+    return users
+
+
+def latest_likers(post_ids, limit=3):
+    """Map post ids to the ids of their ``limit`` most recent likers with a single windowed query"""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+
+    if len(post_ids) == 1:
+        # A plain LIMIT reads just ``limit`` index entries, the window would rank every like of the post
+        post_id, = post_ids
+        rows = db.session.query(Like.user_id)\
+                         .filter(Like.post_id == post_id)\
+                         .order_by(Like.liked_at.desc(), Like.user_id.desc())\
+                         .limit(limit)
+        user_ids = [user_id for user_id, in rows]
+        return {post_id: user_ids} if user_ids else {}
+
+    position = func.row_number().over(
+        partition_by=Like.post_id,
+        order_by=(Like.liked_at.desc(), Like.user_id.desc())
+    ).label("position")
+    ranked = db.session.query(Like.post_id, Like.user_id, position)\
+                       .filter(Like.post_id.in_(post_ids))\
+                       .subquery()
+    rows = db.session.query(ranked.c.post_id, ranked.c.user_id)\
+                     .filter(ranked.c.position <= limit)\
+                     .order_by(ranked.c.post_id, ranked.c.position)
+
+    likers = {}
+    for post_id, user_id in rows:
+        likers.setdefault(post_id, []).append(user_id)
+    return likers
+
+
+def liked_post_ids(user_id, post_ids):
+    """Return which of the posts the user likes with a single primary key lookup, buffered likes included"""
+    from app.like_buffer import like_buffer
+
+    post_ids = set(post_ids)
+    if not post_ids:
+        return set()
+
+    liked = {
+        post_id for post_id, in db.session.query(Like.post_id)
+                                          .filter(Like.post_id.in_(post_ids), Like.user_id == user_id)
+    }
+    for post_id in post_ids:
+        buffered = like_buffer.is_liked(post_id, user_id)
+        if buffered:
+            liked.add(post_id)
+        elif buffered is not None:
+            liked.discard(post_id)
+    return liked
@@ -1,4 +1,10 @@
 from datetime import datetime
+from sqlalchemy import DDL
+from sqlalchemy import and_
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy_utils import EmailType
 from sqlalchemy_utils import PhoneNumberType
 from app import db
@@ -8,17 +14,54 @@ from app.utils.string_manipulation import random_string
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Unicode(25), nullable=False, default=random_string())
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Grows whenever one of the user's posts is created, edited or deleted
+    content_version = db.Column(db.Integer, nullable=False, default=1)
+    deleted_at = db.Column(db.DateTime, index=True)
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+    @classmethod
+    def bump_content_version(cls, user_ids):
+        """Atomically bump the content version of users, without touching their row version"""
+        db.session.execute(update(cls).where(cls.id.in_(user_ids)).values(content_version=cls.content_version + 1))
 
     def __repr__(self):
         return f"<User (name={self.name})>"
 
 
+class AuthIdentity(db.Model):
+    """Every provider account that can log in, whatever the provider.
+
+    Its unique indexes make logins a single lookup and stop an email from being registered
+    twice, even from two providers at once.
+    """
+    FACEBOOK = "facebook"
+    GOOGLE = "google"
+
+    __tablename__ = "auth_identity"
+    __table_args__ = (
+        db.UniqueConstraint("provider", "provider_user_id", name="uq_auth_identity_provider_user_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(16), nullable=False)
+    email = db.Column(EmailType, unique=True, nullable=False, index=True)
+    provider_user_id = db.Column(db.String(128), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+
+    user = db.relationship("User", uselist=False)
+
+    def __repr__(self):
+        return f"<AuthIdentity (provider={self.provider}, email={self.email}, user={self.user})>"
+
+
 class FacebookAuth(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     fb_user_id = db.Column(db.String(128), nullable=False)
     email = db.Column(EmailType, unique=True, nullable=False, index=True)
     phone = db.Column(PhoneNumberType)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     user = db.relationship("User", uselist=False)
 
@@ -31,7 +74,7 @@ class GoogleAuth(db.Model):
     gg_user_id = db.Column(db.String(128), nullable=False)
     email = db.Column(EmailType, unique=True, nullable=False, index=True)
     occupation = db.Column(db.String(128))
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     user = db.relationship("User", uselist=False)
 
@@ -40,24 +83,85 @@ class GoogleAuth(db.Model):
 
 
 class Post(db.Model):
+    __table_args__ = (
+        db.Index("ix_post_created_at_id", "created_at", "id"),
+        db.Index("ix_post_author_id_created_at_id", "author_id", "created_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(50), index=True, nullable=False)
-    body = db.Column(db.Text, nullable=False)
+    body = db.deferred(db.Column(db.Text, nullable=False))
+    overview = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    deleted_at = db.Column(db.DateTime, index=True)
 
     author = db.relationship("User", uselist=False)
-    likes = db.relationship("Like", backref="post", cascade="all,delete", lazy="dynamic")
+    # Posts are purged in batches by app.purge, never by loading their likes into the session
+    likes = db.relationship("Like", backref="post", cascade="all,delete", lazy="dynamic", passive_deletes=True)
+    like_counters = db.relationship("PostLikeCounter", cascade="all,delete", lazy="dynamic", passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+    @classmethod
+    def visible(cls):
+        """Criterion hiding posts, and posts of accounts, that are deleted but not purged yet"""
+        return and_(cls.deleted_at.is_(None), cls.author.has(User.deleted_at.is_(None)))
 
     def __repr__(self):
         return f"<Post (title={self.title}, author={self.author})>"
 
 
 class Like(db.Model):
+    __table_args__ = (
+        db.Index("ix_like_post_id_liked_at", "post_id", "liked_at"),
+        db.Index("ix_like_user_id_liked_at", "user_id", "liked_at", "post_id"),
+    )
+
     post_id = db.Column(db.Integer, db.ForeignKey("post.id"), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    liked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     user = db.relationship("User", uselist=False)
 
     def __repr__(self):
         return f"<Like (post={self.post}, user={self.user})>"
+
+
+class PostLikeCounter(db.Model):
+    """One of the slots a post's like count is spread over, so concurrent likes don't contend on one row"""
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), primary_key=True)
+    slot = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Grows with every like and unlike, its sum identifies the post's like state in ETags
+    changes = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PostLikeCounter (post_id={self.post_id}, slot={self.slot}, count={self.count})>"
+
+
+Post.like_count = db.column_property(
+    select(func.coalesce(func.sum(PostLikeCounter.count), 0))
+        .where(PostLikeCounter.post_id == Post.id)
+        .scalar_subquery(),
+    deferred=True
+)
+
+
+# Full-text search over posts: a FULLTEXT index on MySQL, an FTS5 table kept in sync by app.search on SQLite
+event.listen(
+    Post.__table__,
+    "after_create",
+    DDL("CREATE FULLTEXT INDEX ix_post_fulltext ON post (title, body)").execute_if(dialect="mysql")
+)
+event.listen(
+    Post.__table__,
+    "after_create",
+    DDL("CREATE VIRTUAL TABLE post_fts USING fts5(title, body)").execute_if(dialect="sqlite")
+)
+event.listen(
+    Post.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS post_fts").execute_if(dialect="sqlite")
+)
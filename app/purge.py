@@ -0,0 +1,251 @@
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy import tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app import counters
+from app import search
+from app.feed_buffer import feed_buffer
+from app.models import Like
+from app.models import Post
+from app.models import PostLikeCounter
+from app.models import User
+from app.utils import metrics
+
+
+like_table = Like.__table__
+post_table = Post.__table__
+counter_table = PostLikeCounter.__table__
+user_table = User.__table__
+
+LOCK_NAME = "blog_gotit_purge"
+
+
+class Purger:
+    """Background worker deleting posts and accounts marked as deleted, in small batches.
+
+    Deleting a post or an account only sets its ``deleted_at``, which hides it at once, so the
+    request doesn't depend on how many likes are involved. This worker then deletes the likes on
+    deleted posts and the posts, and for accounts their likes, the likes on their posts, their
+    posts and finally the user. It commits every ``PURGE_BATCH_SIZE`` rows so no transaction
+    holds locks for long, and runs when this worker deletes something and every
+    ``PURGE_INTERVAL`` seconds.
+
+    On MySQL a named lock makes sure a single worker purges at a time, the others skip their run.
+    The counters only add up rows this worker actually deleted.
+    """
+
+    def __init__(self):
+        self.batch_size = 0
+        self.interval = 0
+        self._app = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self.current = None
+        self.accounts = 0
+        self.posts = 0
+        self.likes = 0
+        self.batches = 0
+        self.failures = 0
+        self.skipped = 0
+        self.batch_seconds = 0
+        self.batch_seconds_max = 0
+
+    def init_app(self, app):
+        self.batch_size = app.config["PURGE_BATCH_SIZE"]
+        self.interval = app.config["PURGE_INTERVAL"]
+        self._app = app
+        metrics.register("purge", self.stats)
+
+        if not app.testing:
+            # Not at import time, so CLI commands such as migrations don't start it
+            app.before_first_request(self._ensure_thread)
+
+    def stats(self):
+        return {
+            "current": self.current,
+            "accounts": self.accounts,
+            "posts": self.posts,
+            "likes": self.likes,
+            "batches": self.batches,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "batch_seconds": round(self.batch_seconds, 6),
+            "batch_seconds_max": round(self.batch_seconds_max, 6)
+        }
+
+    def wake(self):
+        if self._app is None or self._app.testing:
+            return
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="purge", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._app.app_context():
+                try:
+                    self.purge_all()
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    self.failures += 1
+                    self._app.logger.error(f"Purge of deleted posts and accounts failed: {e}")
+                finally:
+                    db.session.remove()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def purge_all(self):
+        """Purge every post and account marked as deleted and return how many accounts there were.
+
+        Returns ``None`` without purging anything when another worker or thread is purging already.
+        """
+        if not self._running.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        try:
+            conn = self._lock_database()
+            if conn is False:
+                self.skipped += 1
+                return None
+            try:
+                return self._purge_all()
+            finally:
+                if conn is not None:
+                    conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+                    conn.close()
+        finally:
+            self._running.release()
+
+    def _lock_database(self):
+        """Take the purge lock on MySQL and return the connection holding it, or ``False`` if it is taken"""
+        if db.engine.dialect.name != "mysql":
+            return None
+
+        conn = db.engine.connect()
+        if conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": LOCK_NAME}).scalar() != 1:
+            conn.close()
+            return False
+        return conn
+
+    def _purge_all(self):
+        self.current = {"user_id": None, "posts": 0, "likes": 0, "started_at": time.time()}
+        try:
+            while self._batch(self._delete_tombstoned_posts):
+                pass
+        finally:
+            self.current = None
+
+        purged = 0
+        while True:
+            user_id = db.session.query(User.id)\
+                                .filter(User.deleted_at.isnot(None))\
+                                .order_by(User.deleted_at)\
+                                .limit(1)\
+                                .scalar()
+            if user_id is None:
+                return purged
+
+            purged += self.purge(user_id)
+
+    def purge(self, user_id):
+        self.current = {"user_id": user_id, "posts": 0, "likes": 0, "started_at": time.time()}
+        try:
+            while self._batch(self._delete_user_likes, user_id):
+                pass
+            while self._batch(self._delete_user_posts, user_id):
+                pass
+            deleted = db.session.execute(user_table.delete().where(user_table.c.id == user_id)).rowcount
+            db.session.commit()
+            self.accounts += deleted
+            return deleted
+        finally:
+            self.current = None
+
+    def _batch(self, step, *args):
+        started = time.perf_counter()
+        deleted = step(*args)
+        db.session.commit()
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.batch_seconds += elapsed
+        self.batch_seconds_max = max(self.batch_seconds_max, elapsed)
+        return deleted
+
+    def _delete_user_likes(self, user_id):
+        post_ids = [
+            post_id for post_id, in db.session.query(Like.post_id)
+                                              .filter(Like.user_id == user_id)
+                                              .limit(self.batch_size)
+        ]
+        if not post_ids:
+            return 0
+
+        deleted = db.session.execute(
+            like_table.delete().where(like_table.c.user_id == user_id, like_table.c.post_id.in_(post_ids))
+        ).rowcount
+        if deleted == len(post_ids):
+            for post_id in post_ids:
+                counters.add_likes(post_id, -1)
+        else:
+            # Some were unliked in the meantime, count the likes instead
+            counters.reconcile(post_ids)
+
+        self._count_likes(deleted)
+        for post_id in post_ids:
+            feed_buffer.touch(post_id)
+        return deleted
+
+    def _delete_tombstoned_posts(self):
+        return self._delete_posts(Post.deleted_at.isnot(None))
+
+    def _delete_user_posts(self, user_id):
+        return self._delete_posts(Post.author_id == user_id)
+
+    def _delete_posts(self, criterion):
+        """Delete up to a batch of likes on the matching posts, or else a batch of the posts themselves"""
+        post_ids = [
+            post_id for post_id, in db.session.query(Post.id)
+                                              .filter(criterion)
+                                              .limit(self.batch_size)
+        ]
+        if not post_ids:
+            return 0
+
+        keys = db.session.query(Like.post_id, Like.user_id)\
+                         .filter(Like.post_id.in_(post_ids))\
+                         .limit(self.batch_size)\
+                         .all()
+        if keys:
+            deleted = db.session.execute(
+                like_table.delete().where(tuple_(like_table.c.post_id, like_table.c.user_id).in_(keys))
+            ).rowcount
+            self._count_likes(deleted)
+            return len(keys)
+
+        db.session.execute(counter_table.delete().where(counter_table.c.post_id.in_(post_ids)))
+        for post_id in post_ids:
+            search.unindex_post(post_id)
+        deleted = db.session.execute(post_table.delete().where(post_table.c.id.in_(post_ids))).rowcount
+        for post_id in post_ids:
+            feed_buffer.remove(post_id)
+
+        self.posts += deleted
+        self.current["posts"] += deleted
+        return deleted
+
+    def _count_likes(self, deleted):
+        self.likes += deleted
+        self.current["likes"] += deleted
+
+
+purger = Purger()
@@ -15,8 +15,13 @@ from app.resources.auth import GgLogin
 from app.resources.posts import PostList
 from app.resources.posts import PostDetail
 from app.resources.posts import PostUpload
+from app.resources.posts import PostSearch
+from app.resources.posts import UserPostList
 from app.resources.likes import UserLike
+from app.resources.likes import UserLikeList
 from app.resources.likes import PostLikeList
+from app.resources.metrics import Metrics
+from app.resources.exports import Export
 
 
 api = Api(bp)
@@ -30,6 +35,11 @@ api.add_resource(FbLogin, "/auth/facebook")
 api.add_resource(GgLogin, "/auth/google")
 api.add_resource(PostList, "/posts")
 api.add_resource(PostUpload, "/posts")
+api.add_resource(PostSearch, "/posts/search")
 api.add_resource(PostDetail, "/posts/<int:post_id>")
+api.add_resource(UserPostList, "/users/<int:user_id>/posts")
 api.add_resource(PostLikeList, "/posts/<int:post_id>/likes")
+api.add_resource(UserLikeList, "/users/me/likes")
 api.add_resource(UserLike, "/users/me/likes/<int:post_id>")
+api.add_resource(Metrics, "/metrics")
+api.add_resource(Export, "/export")
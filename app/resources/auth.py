@@ -5,11 +5,13 @@ from flask_jwt_extended import get_jwt_identity
 from flask_jwt_extended.exceptions import UserLookupError
 from flask_restful import Resource
 from flask_restful import reqparse
+from sqlalchemy.orm import joinedload
+from app import db_routing
 from app import jwt
 from app import services
-from app.models import FacebookAuth
-from app.models import GoogleAuth
-from app.models import User
+from app.services.errors import ProviderUnavailableError
+from app.models import AuthIdentity
+from app.user_cache import user_cache
 from app.utils.tokens import create_tokens
 from app.utils.errors import error_response
 from app.utils import http_responses
@@ -21,6 +23,11 @@ def handle_user_lookup_error(e):
     return http_responses.unauthorized(jsonify(error_response("User not found")))
 
 
+@bp.app_errorhandler(ProviderUnavailableError)
+def handle_provider_unavailable_error(e):
+    return http_responses.service_unavailable(jsonify(error_response(str(e))))
+
+
 @jwt.user_identity_loader
 def user_identity_lookup(user_id):
     return user_id
@@ -28,8 +35,14 @@ def user_identity_lookup(user_id):
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    identity = jwt_data["sub"]
-    return User.query.filter_by(id=identity).first()
+    db_routing.route_user(jwt_data["sub"])
+    user = user_cache.get(jwt_data["sub"])
+    if user is None and db_routing.reading_from_replica():
+        # The replica may not have caught up with the user's registration yet
+        db_routing.use_primary()
+        db_routing.fell_back()
+        user = user_cache.get(jwt_data["sub"])
+    return user
 
 
 class TokenRefresh(Resource):
@@ -96,6 +109,8 @@ class FbLogin(Resource):
             description: Invalid Access Token
           404:
             description: User not found
+          503:
+            description: Facebook is unavailable
         """
 
         args = self.parser.parse_args()
@@ -104,12 +119,15 @@ class FbLogin(Resource):
         if "error" in resp:
             return http_responses.unauthorized(resp)
 
-        fb_auth = FacebookAuth.query.filter_by(email=resp["email"]).first()
+        identity = AuthIdentity.query\
+                               .options(joinedload(AuthIdentity.user))\
+                               .filter_by(provider=AuthIdentity.FACEBOOK, provider_user_id=resp["id"])\
+                               .first()
 
-        if fb_auth is None:
+        if identity is None:
             return http_responses.not_found(error_response(f"User with email {resp['email']} not found"))
 
-        return http_responses.ok(create_tokens(fb_auth.user))
+        return http_responses.ok(create_tokens(identity.user))
 
 
 class GgLogin(Resource):
@@ -143,6 +161,8 @@ class GgLogin(Resource):
             description: Invalid Access Token
           404:
             description: User not found
+          503:
+            description: Google is unavailable
         """
 
         args = self.parser.parse_args()
@@ -151,9 +171,12 @@ class GgLogin(Resource):
         if resp is None:
             return http_responses.unauthorized(error_response("Invalid Access Token"))
 
-        gg_auth = GoogleAuth.query.filter_by(email=resp["email"]).first()
+        identity = AuthIdentity.query\
+                               .options(joinedload(AuthIdentity.user))\
+                               .filter_by(provider=AuthIdentity.GOOGLE, provider_user_id=resp["user_id"])\
+                               .first()
 
-        if gg_auth is None:
+        if identity is None:
             return http_responses.not_found(error_response(f"User with email {resp['email']} not found"))
 
-        return http_responses.ok(create_tokens(gg_auth.user))
+        return http_responses.ok(create_tokens(identity.user))
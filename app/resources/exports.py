@@ -0,0 +1,59 @@
+from datetime import datetime
+from flask import current_app
+from flask import request
+from flask import stream_with_context
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from flask_jwt_extended import current_user
+from app import exports
+from app.utils.admins import is_admin
+from app.utils.errors import error_response
+from app.utils import http_responses
+
+
+class Export(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Export all posts and likes as newline-delimited JSON
+        ---
+        tags:
+          - export
+        produces:
+          - application/x-ndjson
+        parameters:
+          - in: header
+            name: Authorization
+            description: Access token of a user whose email is in ADMINS
+            schema:
+              type: bearer
+              example: Bearer <JWT Access Token>
+            required: true
+          - in: query
+            name: since
+            description: Only export posts and likes created at or after this ISO 8601 time, edits of older posts aren't included
+            type: string
+        responses:
+          200:
+            description: One JSON object per line, every post (type "post") followed by every like (type "like")
+          400:
+            description: Invalid since
+          401:
+            description: Invalid token
+          403:
+            description: Not an admin
+        """
+
+        if not is_admin(current_user.id):
+            return http_responses.forbidden(error_response("Only admins can export posts and likes"))
+
+        since = request.args.get("since")
+        try:
+            since = since and datetime.fromisoformat(since)
+        except ValueError:
+            return http_responses.bad_request(error_response("Invalid since"))
+
+        return current_app.response_class(
+            stream_with_context(exports.export_lines(since or None)),
+            mimetype="application/x-ndjson"
+        )
@@ -4,10 +4,18 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from flask_jwt_extended import current_user
 from app import db
+from app import counters
+from app import like_store
+from app.feed_buffer import feed_buffer
+from app.like_buffer import like_buffer
 from app.models import Like
 from app.models import Post
+from app.models import PostLikeCounter
 from app.schemas import LikeSchema
+from app.schemas import PostListSchema
+from app.utils import etags
 from app.utils.errors import error_response
+from app.utils.pagination import paginate_by_cursor
 from app.utils import http_responses
 
 
@@ -31,30 +39,101 @@ class PostLikeList(Resource):
             name: post_id
             required: true
             type: string
+          - in: header
+            name: If-None-Match
+            description: ETag of a previously fetched version of the likes
+            type: string
         responses:
           200:
             description: List of a post's likes
+            headers:
+              ETag:
+                type: string
             schema:
               type: array
               items:
                 $ref: '#/definitions/LikeResponse'
+          304:
+            description: Likes not modified since the given ETag
           401:
             description: Invalid token
           404:
             description: Post not found
         """
 
-        post = Post.query.filter_by(id=post_id).first()
+        page = request.args.get("page", 1, type=int)
+        like_changes = db.session.query(counters.like_changes(PostLikeCounter.post_id == Post.id))\
+                                 .filter(Post.id == post_id, Post.visible())\
+                                 .scalar()
 
-        if post is None:
+        if like_changes is None:
             return http_responses.not_found(error_response(f"Post with id {post_id} not found"))
 
-        page = request.args.get("page", 1, type=int)
+        etag = etags.make_etag(like_changes, page)
+        if etags.matches_if_none_match(etag):
+            return http_responses.not_modified(etags.headers(etag))
+
         likes = Like.query\
                     .filter_by(post_id=post_id)\
+                    .order_by(Like.liked_at.desc(), Like.user_id.desc())\
                     .paginate(page, current_app.config["LIKES_PER_PAGE"], False)\
                     .items
-        return http_responses.ok(LikeSchema(many=True).dump(likes))
+        return http_responses.ok(LikeSchema(many=True).dump(likes), etags.headers(etag))
+
+
+class UserLikeList(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Get list of the posts you liked
+        ---
+        tags:
+          - likes
+        parameters:
+          - in: header
+            name: Authorization
+            description: You have to log in/register first to get the access token
+            schema:
+              type: bearer
+              example: Bearer <JWT Access Token>
+            required: true
+          - in: query
+            name: cursor
+            description: Opaque cursor taken from the X-Next-Cursor header of the previous page
+            type: string
+        responses:
+          200:
+            description: List of the liked posts, most recently liked first
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor of the next page, absent on the last page
+            schema:
+              type: array
+              items:
+                $ref: '#/definitions/PostResponse'
+          400:
+            description: Invalid cursor
+          401:
+            description: Invalid token
+        """
+
+        try:
+            rows, next_cursor = paginate_by_cursor(
+                db.session.query(Post, Like.liked_at)
+                          .join(Like, Like.post_id == Post.id)
+                          .filter(Like.user_id == current_user.id, Post.visible()),
+                [Like.liked_at, Like.post_id],
+                lambda row: (row.liked_at, row.Post.id),
+                request.args.get("cursor"),
+                current_app.config["POSTS_PER_PAGE"]
+            )
+        except ValueError:
+            return http_responses.bad_request(error_response("Invalid cursor"))
+
+        posts = [row.Post for row in rows]
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return http_responses.ok(PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts), headers)
 
 
 class UserLike(Resource):
@@ -90,21 +169,21 @@ class UserLike(Resource):
             description: Post not found
         """
 
-        post = Post.query.filter_by(id=post_id).first()
+        store = like_buffer if like_buffer.enabled else like_store
+        outcome = store.like(post_id, current_user.id)
 
-        if post is None:
+        if outcome == like_store.POST_NOT_FOUND:
             return http_responses.not_found(error_response(f"Post with id {post_id} not found"))
 
-        like = Like.query.filter_by(post_id=post_id).filter_by(user_id=current_user.id).first()
-
-        if like is not None:
+        if outcome == like_store.ALREADY_LIKED:
             return http_responses.forbidden(error_response("You cannot like a post twice"))
 
-        like = Like(post=post, user=current_user)
-        db.session.add(like)
-        db.session.commit()
+        if store is like_store:
+            counters.add_likes(post_id, 1)
+            db.session.commit()
+            feed_buffer.touch(post_id)
 
-        return http_responses.created(LikeSchema().dump(like))
+        return http_responses.created(LikeSchema().dump(Like(post_id=post_id, user_id=current_user.id)))
 
     @jwt_required()
     def delete(self, post_id):
@@ -136,13 +215,13 @@ class UserLike(Resource):
             description: Post not found
         """
 
-        like = Like.query.filter_by(post_id=post_id).filter_by(user_id=current_user.id).first()
-
-        if like is None:
+        store = like_buffer if like_buffer.enabled else like_store
+        if not store.unlike(post_id, current_user.id):
             return http_responses.not_found(error_response("You haven't like this post yet"))
-            
-        json_returned = LikeSchema().dump(like)
-        db.session.delete(like)
-        db.session.commit()
 
-        return http_responses.ok(json_returned)
+        if store is like_store:
+            counters.add_likes(post_id, -1)
+            db.session.commit()
+            feed_buffer.touch(post_id)
+
+        return http_responses.ok(LikeSchema().dump(Like(post_id=post_id, user_id=current_user.id)))
@@ -0,0 +1,40 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from flask_jwt_extended import current_user
+from app.utils import metrics
+from app.utils.admins import is_admin
+from app.utils.errors import error_response
+from app.utils import http_responses
+
+
+class Metrics(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Get this worker's runtime metrics
+        ---
+        tags:
+          - metrics
+        parameters:
+          - in: header
+            name: Authorization
+            description: Access token of a user whose email is in ADMINS
+            schema:
+              type: bearer
+              example: Bearer <JWT Access Token>
+            required: true
+        responses:
+          200:
+            description: Counters and gauges of this worker, grouped by component
+            schema:
+              type: object
+          401:
+            description: Invalid token
+          403:
+            description: Not an admin
+        """
+
+        if not is_admin(current_user.id):
+            return http_responses.forbidden(error_response("Only admins can read the metrics"))
+
+        return http_responses.ok(metrics.snapshot())
@@ -1,17 +1,60 @@
+from datetime import datetime
 from flask import request
 from flask import current_app
 from flask_restful import Resource
 from flask_restful import reqparse
 from flask_jwt_extended import jwt_required
 from flask_jwt_extended import current_user
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
+from app import counters
+from app import loaders
+from app import search
+from app.feed_buffer import feed_buffer
+from app.purge import purger
 from app.models import Post
+from app.models import PostLikeCounter
+from app.models import User
 from app.schemas import PostSchema
 from app.schemas import PostListSchema
+from app.utils import etags
 from app.utils.errors import error_response
+from app.utils.pagination import paginate_by_cursor
+from app.utils.string_manipulation import truncate_string
 from app.utils import http_responses
 
 
+def _post_etag(post_id):
+    """ETag of a post's detail from a single lookup of the post, author and like-state versions"""
+    row = db.session.query(Post.version, User.version, counters.like_changes(PostLikeCounter.post_id == Post.id))\
+                    .join(Post.author)\
+                    .filter(Post.id == post_id, Post.deleted_at.is_(None), User.deleted_at.is_(None))\
+                    .first()
+    return row and etags.make_etag(*row)
+
+
+def _with_liked_by_me(items):
+    """Copy buffered feed items with the current user's like state, which the shared buffer doesn't hold"""
+    liked = loaders.liked_post_ids(current_user.id, [item["id"] for item in items])
+    return [dict(item, liked_by_me=item["id"] in liked) for item in items]
+
+
+def _overview(body):
+    return truncate_string(body, current_app.config["BODY_OVERVIEW_LENGTH"])
+
+
+def paginate_author_posts(author_id, cursor):
+    """Return a page of an author's posts, newest first, and the cursor of the next page"""
+    return paginate_by_cursor(
+        Post.query.filter(Post.author_id == author_id, Post.visible()),
+        [Post.created_at, Post.id],
+        lambda post: (post.created_at, post.id),
+        cursor,
+        current_app.config["POSTS_PER_PAGE"]
+    )
+
+
 class PostList(Resource):
     @jwt_required()
     def get(self):
@@ -28,23 +71,181 @@ class PostList(Resource):
               type: bearer
               example: Bearer <JWT Access Token>
             required: true
+          - in: query
+            name: cursor
+            description: Opaque cursor taken from the X-Next-Cursor header of the previous page
+            type: string
+          - in: query
+            name: page
+            description: Page number, kept for older clients. Ignored when a cursor is given
+            type: integer
         responses:
           200:
             description: List of posts
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor of the next page, absent on the last page
+            schema:
+              type: array
+              items:
+                $ref: '#/definitions/PostResponse'
+          400:
+            description: Invalid cursor
+          401:
+            description: Invalid token
+        """
+
+        per_page = current_app.config["POSTS_PER_PAGE"]
+        cursor = request.args.get("cursor")
+
+        if cursor is None and "page" in request.args:
+            page = request.args.get("page", 1, type=int)
+            buffered = feed_buffer.page_at(page, per_page)
+            if buffered is not None:
+                return http_responses.ok(_with_liked_by_me(buffered[0]))
+
+            posts = Post.query\
+                        .filter(Post.visible())\
+                        .order_by(Post.created_at.desc(), Post.id.desc())\
+                        .paginate(page, per_page, False)\
+                        .items
+            return http_responses.ok(PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts))
+
+        try:
+            buffered = feed_buffer.page_after(cursor, per_page)
+            if buffered is not None:
+                items, next_cursor = buffered
+                items = _with_liked_by_me(items)
+            else:
+                posts, next_cursor = paginate_by_cursor(
+                    Post.query.filter(Post.visible()),
+                    [Post.created_at, Post.id],
+                    lambda post: (post.created_at, post.id),
+                    cursor,
+                    per_page
+                )
+                items = PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts)
+        except ValueError:
+            return http_responses.bad_request(error_response("Invalid cursor"))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return http_responses.ok(items, headers)
+
+
+class PostSearch(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Search posts by title and body
+        ---
+        tags:
+          - posts
+        parameters:
+          - in: header
+            name: Authorization
+            description: You have to log in/register first to get the access token
+            schema:
+              type: bearer
+              example: Bearer <JWT Access Token>
+            required: true
+          - in: query
+            name: q
+            description: Words to search for
+            type: string
+            required: true
+          - in: query
+            name: cursor
+            description: Opaque cursor taken from the X-Next-Cursor header of the previous page
+            type: string
+        responses:
+          200:
+            description: Matching posts, best match first among the SEARCH_MAX_CANDIDATES newest matches
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor of the next page, absent on the last page
             schema:
               type: array
               items:
                 $ref: '#/definitions/PostResponse'
+          400:
+            description: Missing query or invalid cursor
           401:
             description: Invalid token
         """
 
-        page = request.args.get("page", 1, type=int)
-        posts = Post.query\
-                    .order_by(Post.created_at.desc())\
-                    .paginate(page, current_app.config["POSTS_PER_PAGE"], False)\
-                    .items
-        return http_responses.ok(PostListSchema(many=True).dump(posts))
+        q = request.args.get("q", "").strip()
+        if not q:
+            return http_responses.bad_request(error_response("Search query is required"))
+
+        try:
+            posts, next_cursor = search.search_posts(
+                q,
+                request.args.get("cursor"),
+                current_app.config["POSTS_PER_PAGE"],
+                current_app.config["SEARCH_MAX_CANDIDATES"]
+            )
+        except ValueError:
+            return http_responses.bad_request(error_response("Invalid cursor"))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return http_responses.ok(PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts), headers)
+
+
+class UserPostList(Resource):
+    @jwt_required()
+    def get(self, user_id):
+        """
+        Get list of a user's posts
+        ---
+        tags:
+          - posts
+        parameters:
+          - in: header
+            name: Authorization
+            description: You have to log in/register first to get the access token
+            schema:
+              type: bearer
+              example: Bearer <JWT Access Token>
+            required: true
+          - in: path
+            name: user_id
+            required: true
+            type: string
+          - in: query
+            name: cursor
+            description: Opaque cursor taken from the X-Next-Cursor header of the previous page, or the next_cursor of a profile
+            type: string
+        responses:
+          200:
+            description: List of the user's posts, newest first
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor of the next page, absent on the last page
+            schema:
+              type: array
+              items:
+                $ref: '#/definitions/PostResponse'
+          400:
+            description: Invalid cursor
+          401:
+            description: Invalid token
+          404:
+            description: User not found
+        """
+
+        try:
+            posts, next_cursor = paginate_author_posts(user_id, request.args.get("cursor"))
+        except ValueError:
+            return http_responses.bad_request(error_response("Invalid cursor"))
+
+        if not posts and User.query.filter_by(id=user_id, deleted_at=None).first() is None:
+            return http_responses.not_found(error_response(f"User with id {user_id} not found"))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return http_responses.ok(PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts), headers)
 
 
 class PostUpload(Resource):
@@ -90,10 +291,13 @@ class PostUpload(Resource):
         """
 
         args = self.parser.parse_args()
-        post = Post(author=current_user, **args)
+        post = Post(author=current_user, overview=_overview(args["body"]), **args)
         db.session.add(post)
+        User.bump_content_version([current_user.id])
+        search.index_post(post)
         db.session.commit()
-        return http_responses.created(PostSchema().dump(post))
+        feed_buffer.put(post)
+        return http_responses.created(PostSchema(context={"user_id": current_user.id}).dump(post))
 
 
 class PostDetail(Resource):
@@ -120,23 +324,36 @@ class PostDetail(Resource):
             name: post_id
             required: true
             type: string
+          - in: header
+            name: If-None-Match
+            description: ETag of a previously fetched version of the post
+            type: string
         responses:
           200:
             description: Post detail
+            headers:
+              ETag:
+                type: string
             schema:
               $ref: '#/definitions/PostResponse'
+          304:
+            description: Post not modified since the given ETag
           401:
             description: Invalid token
           404:
             description: Post not found
         """
 
-        post = Post.query.filter_by(id=post_id).first()
+        etag = _post_etag(post_id)
 
-        if post is None:
+        if etag is None:
             return http_responses.not_found(error_response(f"Post with id {post_id} not found"))
 
-        return http_responses.ok(PostSchema().dump(post))
+        if etags.matches_if_none_match(etag):
+            return http_responses.not_modified(etags.headers(etag))
+
+        post = Post.query.options(undefer(Post.body)).filter_by(id=post_id).first()
+        return http_responses.ok(PostSchema(context={"user_id": current_user.id}).dump(post), etags.headers(etag))
 
     @jwt_required()
     def put(self, post_id):
@@ -157,6 +374,10 @@ class PostDetail(Resource):
             name: post_id
             required: true
             type: string
+          - in: header
+            name: If-Match
+            description: ETag of the post version being edited, the update is rejected if it changed since
+            type: string
           - in: body
             name: body
             required: true
@@ -181,10 +402,12 @@ class PostDetail(Resource):
             description: Update not allowed
           404:
             description: Post not found
+          412:
+            description: Post was modified since the given ETag
         """
 
         args = self.parser.parse_args()
-        post = Post.query.filter_by(id=post_id).first()
+        post = Post.query.options(undefer(Post.body)).filter_by(id=post_id, deleted_at=None).first()
         
         if post is None:
             return http_responses.not_found(error_response(f"Post with id {post_id} not found"))
@@ -192,11 +415,23 @@ class PostDetail(Resource):
         if post.author != current_user:
             return http_responses.forbidden(error_response("You are the author of this post"))
 
+        if not etags.matches_if_match(post.version):
+            return http_responses.precondition_failed(error_response("Post has been modified"))
+
         post.title = args["title"]
         post.body = args["body"]
+        post.overview = _overview(args["body"])
+        post.version += 1
         db.session.add(post)
-        db.session.commit()
-        return http_responses.ok(PostSchema().dump(post))
+        User.bump_content_version([current_user.id])
+        search.index_post(post)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return http_responses.precondition_failed(error_response("Post has been modified"))
+        feed_buffer.put(post)
+        return http_responses.ok(PostSchema(context={"user_id": current_user.id}).dump(post))
 
     @jwt_required()
     def delete(self, post_id):
@@ -230,7 +465,7 @@ class PostDetail(Resource):
             description: Post not found
         """
 
-        post = Post.query.filter_by(id=post_id).first()
+        post = Post.query.options(undefer(Post.body)).filter_by(id=post_id, deleted_at=None).first()
         
         if post is None:
             return http_responses.not_found(error_response(f"Post with id {post_id} not found"))
@@ -238,8 +473,14 @@ class PostDetail(Resource):
         if post.author != current_user:
             return http_responses.forbidden(error_response("You are the author of this post"))
 
-        json_returned = PostSchema().dump(post)
-        db.session.delete(post)
+        json_returned = PostSchema(context={"user_id": current_user.id}).dump(post)
+        # Hides the post at once, it is purged with its likes in the background
+        post.deleted_at = datetime.utcnow()
+        post.version += 1
+        User.bump_content_version([current_user.id])
+        search.unindex_post(post_id)
         db.session.commit()
+        feed_buffer.remove(post_id)
+        purger.wake()
 
         return http_responses.ok(json_returned)
@@ -1,18 +1,64 @@
+from datetime import datetime
+from flask import current_app
 from flask_restful import Resource
 from flask_restful import reqparse
 from flask_jwt_extended import jwt_required
 from flask_jwt_extended import current_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
+from app import counters
 from app import services
-from app.models import Like
+from app.purge import purger
+from app.feed_buffer import feed_buffer
+from app.user_cache import user_cache
+from app.models import AuthIdentity
 from app.models import User
 from app.models import FacebookAuth
 from app.models import Post
+from app.models import PostLikeCounter
 from app.models import GoogleAuth
+from app.utils import etags
 from app.utils.tokens import create_tokens
 from app.utils.errors import error_response
 from app.utils import http_responses
 from app.schemas import PostListSchema
+from app.resources.posts import paginate_author_posts
+
+
+def _load_profile(auth_model):
+    """Load the current user's auth row and profile ETag with a single joined query.
+
+    The ETag combines the user's row and content versions with the like-state tokens of the
+    posts on the profile's first page, so checking it costs the same however many posts the
+    user wrote. Posts entering or leaving that page bump the content version.
+    """
+    first_page = select(Post.id)\
+                     .where(Post.author_id == current_user.id, Post.deleted_at.is_(None))\
+                     .order_by(Post.created_at.desc(), Post.id.desc())\
+                     .limit(current_app.config["POSTS_PER_PAGE"])\
+                     .subquery()
+    like_changes = counters.like_changes(PostLikeCounter.post_id == first_page.c.id)
+    row = db.session.query(auth_model, User.version, User.content_version, like_changes)\
+                    .join(auth_model.user)\
+                    .filter(auth_model.user_id == current_user.id)\
+                    .first()
+    if row is None:
+        return None, None
+
+    auth, *versions = row
+    if versions[0] != current_user.version:
+        # The cached user is behind a change made by another worker
+        db.session.refresh(current_user)
+        user_cache.invalidate(current_user.id)
+    return auth, etags.make_etag(*versions)
+
+
+def _registered_provider(email):
+    """Return the provider an email is registered from, after a registration hit a unique index"""
+    identity = AuthIdentity.query.filter_by(email=email).first()
+    return identity and identity.provider
 
 
 class FbRegister(Resource):
@@ -49,6 +95,8 @@ class FbRegister(Resource):
             description: Account existed
           401:
             description: Invalid Access Token
+          503:
+            description: Facebook is unavailable
         """
 
         args = self.parser.parse_args()
@@ -60,17 +108,19 @@ class FbRegister(Resource):
         if resp["id"] != args["userId"]:
             return http_responses.bad_request(error_response("Invalid Access Token"))
 
-        if GoogleAuth.query.filter_by(email=resp["email"]).first():
-            return http_responses.bad_request(error_response(f"Account with {resp['email']} has been registered from Google"))
-
-        if FacebookAuth.query.filter_by(email=resp["email"]).first():
-            return http_responses.bad_request(error_response(f"Account with {resp['email']} is existed"))
-        
         user = User(name=resp["name"])
+        identity = AuthIdentity(provider=AuthIdentity.FACEBOOK, email=resp["email"], provider_user_id=resp["id"], user=user)
         fb_auth = FacebookAuth(email=resp["email"], fb_user_id=resp["id"], user=user)
         db.session.add(user)
+        db.session.add(identity)
         db.session.add(fb_auth)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if _registered_provider(resp["email"]) == AuthIdentity.GOOGLE:
+                return http_responses.bad_request(error_response(f"Account with {resp['email']} has been registered from Google"))
+            return http_responses.bad_request(error_response(f"Account with {resp['email']} is existed"))
         return http_responses.created(create_tokens(user))
 
 
@@ -79,14 +129,15 @@ class FbProfile(Resource):
     parser.add_argument("name", type=str, required=True, help="Name is required")
     parser.add_argument("phone", type=str, required=True, help="Phone Number is required")
 
-    def __to_dict(self):
-        phone = FacebookAuth.query.filter_by(user_id=current_user.id).first().phone
+    def __to_dict(self, fb_auth):
+        posts, next_cursor = paginate_author_posts(current_user.id, None)
 
         return {
             "id": current_user.id,
             "name": current_user.name,
-            "phone": phone and phone.national,
-            "posts": PostListSchema(many=True).dump(Post.query.filter_by(author_id=current_user.id).all())
+            "phone": fb_auth.phone and fb_auth.phone.national,
+            "posts": PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts),
+            "next_cursor": next_cursor
         }
 
     @jwt_required()
@@ -104,21 +155,35 @@ class FbProfile(Resource):
             schema:
               type: bearer
               example: Bearer <JWT Access Token>
+          - in: header
+            name: If-None-Match
+            description: ETag of a previously fetched version of the profile
+            type: string
         responses:
           200:
             description: Current Facebook user's profile
+            headers:
+              ETag:
+                type: string
             schema:
               $ref: '#/definitions/FbUserProfileResponse'
+          304:
+            description: Profile not modified since the given ETag
           401:
             description: Invalid token
           404:
             description: Current user not found
         """
 
-        if FacebookAuth.query.filter_by(user_id=current_user.id).first() is None:
+        fb_auth, etag = _load_profile(FacebookAuth)
+
+        if fb_auth is None:
             return http_responses.not_found(error_response(f"You haven't register a Facebook account"))
 
-        return http_responses.ok(self.__to_dict())
+        if etags.matches_if_none_match(etag):
+            return http_responses.not_modified(etags.headers(etag))
+
+        return http_responses.ok(self.__to_dict(fb_auth), etags.headers(etag))
 
     @jwt_required()
     def put(self):
@@ -157,6 +222,8 @@ class FbProfile(Resource):
             description: Invalid token
           404:
             description: Current user not found
+          409:
+            description: The profile was changed by a concurrent request
         """
 
         args = self.parser.parse_args()
@@ -165,12 +232,25 @@ class FbProfile(Resource):
         if fb_auth is None:
             return http_responses.not_found(error_response("You haven't register a Facebook account"))
 
+        # The version check of the update needs the stored row, not a cached copy
+        db.session.refresh(current_user)
+        if args["name"] != current_user.name:
+            # Posts the user liked show the name among their likers
+            counters.touch_liked_by(current_user.id)
         current_user.name = args["name"]
         fb_auth.phone = args["phone"]
+        current_user.version += 1
         db.session.add(current_user)
         db.session.add(fb_auth)
-        db.session.commit()
-        return http_responses.ok(self.__to_dict())
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another request changed the account since it was refreshed
+            db.session.rollback()
+            return http_responses.conflict(error_response("Your profile was changed by another request, try again"))
+        user_cache.invalidate(current_user.id)
+        feed_buffer.invalidate()
+        return http_responses.ok(self.__to_dict(fb_auth))
 
     @jwt_required()
     def delete(self):
@@ -196,6 +276,8 @@ class FbProfile(Resource):
             description: Invalid token
           404:
             description: Current user not found
+          409:
+            description: The profile was changed by a concurrent request
         """
 
         fb_auth = FacebookAuth.query.filter_by(user_id=current_user.id).first()
@@ -203,12 +285,24 @@ class FbProfile(Resource):
         if fb_auth is None:
             return http_responses.not_found(error_response("You haven't register a Facebook account"))
 
-        json_returned = self.__to_dict()
+        user_id = current_user.id
+        db.session.refresh(current_user)
+        json_returned = self.__to_dict(fb_auth)
         db.session.delete(fb_auth)
-        Like.query.filter_by(user_id=current_user.id).delete()
-        Post.query.filter_by(author_id=current_user.id).delete()
-        db.session.delete(current_user)
-        db.session.commit()
+        AuthIdentity.query.filter_by(user_id=user_id).delete()
+        # Hides the account at once, its posts and likes are purged in the background
+        current_user.deleted_at = datetime.utcnow()
+        current_user.version += 1
+        counters.touch_liked_by(user_id)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another request changed the account since it was refreshed
+            db.session.rollback()
+            return http_responses.conflict(error_response("Your profile was changed by another request, try again"))
+        user_cache.invalidate(user_id)
+        feed_buffer.invalidate()
+        purger.wake()
         return http_responses.ok(json_returned)
 
 
@@ -246,6 +340,8 @@ class GgRegister(Resource):
             description: Account existed
           401:
             description: Invalid Access Token
+          503:
+            description: Google is unavailable
         """
 
         args = self.parser.parse_args()
@@ -254,18 +350,20 @@ class GgRegister(Resource):
         if resp is None or resp["user_id"] != args["userId"]:
             return http_responses.bad_request(error_response("Invalid Access Token"))
 
-        if FacebookAuth.query.filter_by(email=resp["email"]).first():
-            services.google_auth.delete_user(resp["user_id"])
-            return http_responses.bad_request(error_response(f"Account with {resp['email']} has been registered from Facebook"))
-
-        if GoogleAuth.query.filter_by(email=resp["email"]).first():
-            return http_responses.bad_request(error_response(f"Account with {resp['email']} is existed"))
-
         user = User(name=resp["name"])
+        identity = AuthIdentity(provider=AuthIdentity.GOOGLE, email=resp["email"], provider_user_id=resp["user_id"], user=user)
         gg_auth = GoogleAuth(email=resp["email"], gg_user_id=resp["user_id"], user=user)
         db.session.add(user)
+        db.session.add(identity)
         db.session.add(gg_auth)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if _registered_provider(resp["email"]) == AuthIdentity.FACEBOOK:
+                services.google_auth.delete_user(resp["user_id"])
+                return http_responses.bad_request(error_response(f"Account with {resp['email']} has been registered from Facebook"))
+            return http_responses.bad_request(error_response(f"Account with {resp['email']} is existed"))
         return http_responses.created(create_tokens(user))
 
 
@@ -274,12 +372,15 @@ class GgProfile(Resource):
     parser.add_argument("name", type=str, required=True, help="Name is required")
     parser.add_argument("occupation", type=str, required=True, help="Occupation is required")
 
-    def __to_dict(self):
+    def __to_dict(self, gg_auth):
+        posts, next_cursor = paginate_author_posts(current_user.id, None)
+
         return {
             "id": current_user.id,
             "name": current_user.name,
-            "occupation": GoogleAuth.query.filter_by(user_id=current_user.id).first().occupation,
-            "posts": PostListSchema(many=True).dump(Post.query.filter_by(author_id=current_user.id).all())
+            "occupation": gg_auth.occupation,
+            "posts": PostListSchema(many=True, context={"user_id": current_user.id}).dump(posts),
+            "next_cursor": next_cursor
         }
 
     @jwt_required()
@@ -297,21 +398,35 @@ class GgProfile(Resource):
               type: bearer
               example: Bearer <JWT Access Token>
             required: true
+          - in: header
+            name: If-None-Match
+            description: ETag of a previously fetched version of the profile
+            type: string
         responses:
           200:
             description: Current Google user's profile
+            headers:
+              ETag:
+                type: string
             schema:
               $ref: '#/definitions/GgUserProfileResponse'
+          304:
+            description: Profile not modified since the given ETag
           401:
             description: Invalid token
           404:
             description: Current user not found
         """
 
-        if GoogleAuth.query.filter_by(user_id=current_user.id).first() is None:
+        gg_auth, etag = _load_profile(GoogleAuth)
+
+        if gg_auth is None:
             return http_responses.not_found(error_response(f"You haven't register a Google account"))
 
-        return http_responses.ok(self.__to_dict())
+        if etags.matches_if_none_match(etag):
+            return http_responses.not_modified(etags.headers(etag))
+
+        return http_responses.ok(self.__to_dict(gg_auth), etags.headers(etag))
 
     @jwt_required()
     def put(self):
@@ -350,6 +465,8 @@ class GgProfile(Resource):
             description: Invalid token
           404:
             description: Current user not found
+          409:
+            description: The profile was changed by a concurrent request
         """
 
         args = self.parser.parse_args()
@@ -358,12 +475,25 @@ class GgProfile(Resource):
         if gg_auth is None:
             return http_responses.not_found(error_response(f"You haven't register a Google account"))
 
+        # The version check of the update needs the stored row, not a cached copy
+        db.session.refresh(current_user)
+        if args["name"] != current_user.name:
+            # Posts the user liked show the name among their likers
+            counters.touch_liked_by(current_user.id)
         current_user.name = args["name"]
         gg_auth.occupation = args["occupation"]
+        current_user.version += 1
         db.session.add(current_user)
         db.session.add(gg_auth)
-        db.session.commit()
-        return http_responses.ok(self.__to_dict())
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another request changed the account since it was refreshed
+            db.session.rollback()
+            return http_responses.conflict(error_response("Your profile was changed by another request, try again"))
+        user_cache.invalidate(current_user.id)
+        feed_buffer.invalidate()
+        return http_responses.ok(self.__to_dict(gg_auth))
 
     @jwt_required()
     def delete(self):
@@ -389,6 +519,8 @@ class GgProfile(Resource):
             description: Invalid token
           404:
             description: Current user not found
+          409:
+            description: The profile was changed by a concurrent request
         """
 
         gg_auth = GoogleAuth.query.filter_by(user_id=current_user.id).first()
@@ -396,10 +528,22 @@ class GgProfile(Resource):
         if gg_auth is None:
             return http_responses.not_found(error_response("You haven't register a Google account"))
 
-        json_returned = self.__to_dict()
+        user_id = current_user.id
+        db.session.refresh(current_user)
+        json_returned = self.__to_dict(gg_auth)
         db.session.delete(gg_auth)
-        Like.query.filter_by(user_id=current_user.id).delete()
-        Post.query.filter_by(author_id=current_user.id).delete()
-        db.session.delete(current_user)
-        db.session.commit()
+        AuthIdentity.query.filter_by(user_id=user_id).delete()
+        # Hides the account at once, its posts and likes are purged in the background
+        current_user.deleted_at = datetime.utcnow()
+        current_user.version += 1
+        counters.touch_liked_by(user_id)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another request changed the account since it was refreshed
+            db.session.rollback()
+            return http_responses.conflict(error_response("Your profile was changed by another request, try again"))
+        user_cache.invalidate(user_id)
+        feed_buffer.invalidate()
+        purger.wake()
         return http_responses.ok(json_returned)
@@ -1,14 +1,16 @@
-from flask import current_app
+from marshmallow import pre_dump
 from app import ma
+from app import counters
+from app import loaders
 from app.models import User
 from app.models import Post
 from app.models import Like
-from app.utils.string_manipulation import truncate_string
 
 
 class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
+        fields = ("id", "name")
 
 
 class LikeSchema(ma.SQLAlchemySchema):
@@ -16,34 +18,71 @@ class LikeSchema(ma.SQLAlchemySchema):
         model = Like
 
     post_id = ma.auto_field()
-    user = ma.Nested(UserSchema)
+    user = ma.Method("get_user")
 
+    @pre_dump(pass_many=True)
+    def load_users(self, data, many, **kwargs):
+        likes = data if many else [data]
+        self.context["users"] = loaders.users_by_id(like.user_id for like in likes)
+        return data
 
-class OverallLikeSchema(ma.SQLAlchemySchema):
-    class Meta:
-        model = Like
+    def get_user(self, like):
+        return UserSchema().dump(self.context["users"][like.user_id])
+
+
+class BasePostSchema(ma.SQLAlchemySchema):
+    """Resolves authors and like summaries of every dumped post in a fixed number of queries.
+
+    ``liked_by_me`` is resolved for the ``user_id`` given in the context, and is false without one.
+    """
+
+    author = ma.Method("get_author")
+    likes = ma.Method("get_likes")
+    liked_by_me = ma.Method("get_liked_by_me")
 
-    latest_likes = ma.Function(
-        lambda likes: LikeSchema(many=True).dump(likes.limit(3).all())
-    )
-    total = ma.Function(lambda likes: likes.count())
+    @pre_dump(pass_many=True)
+    def load_relations(self, data, many, **kwargs):
+        posts = data if many else [data]
+        post_ids = [post.id for post in posts]
+        likers = loaders.latest_likers(post_ids)
+        user_ids = [post.author_id for post in posts]
+        user_ids += [user_id for ids in likers.values() for user_id in ids]
 
+        self.context["likers"] = likers
+        self.context["totals"] = counters.like_totals(post_ids)
+        self.context["users"] = loaders.users_by_id(user_ids)
+        user_id = self.context.get("user_id")
+        self.context["liked"] = loaders.liked_post_ids(user_id, post_ids) if user_id else set()
+        return data
 
-class PostListSchema(ma.SQLAlchemySchema):
+    def get_author(self, post):
+        return UserSchema().dump(self.context["users"][post.author_id])
+
+    def get_likes(self, post):
+        users = self.context["users"]
+        return {
+            "latest_likes": [
+                {"post_id": post.id, "user": UserSchema().dump(users[user_id])}
+                for user_id in self.context["likers"].get(post.id, [])
+            ],
+            "total": self.context["totals"].get(post.id, 0)
+        }
+
+    def get_liked_by_me(self, post):
+        return post.id in self.context["liked"]
+
+
+class PostListSchema(BasePostSchema):
     class Meta:
         model = Post
-    
+
     id = ma.auto_field()
     title = ma.auto_field()
-    body = ma.Function(
-        lambda post: truncate_string(post.body, current_app.config["BODY_OVERVIEW_LENGTH"])
-    )
+    body = ma.String(attribute="overview")
     created_at = ma.auto_field()
-    author = ma.Nested(UserSchema)
-    likes = ma.Nested(OverallLikeSchema)
 
 
-class PostSchema(ma.SQLAlchemySchema):
+class PostSchema(BasePostSchema):
     class Meta:
         model = Post
 
@@ -51,5 +90,3 @@ class PostSchema(ma.SQLAlchemySchema):
     title = ma.auto_field()
     body = ma.auto_field()
     created_at = ma.auto_field()
-    author = ma.Nested(UserSchema)
-    likes = ma.Nested(OverallLikeSchema)
@@ -0,0 +1,76 @@
+from sqlalchemy import Float
+from sqlalchemy import Integer
+from sqlalchemy import column
+from sqlalchemy import func
+from sqlalchemy import literal_column
+from sqlalchemy import table
+from sqlalchemy import type_coerce
+from sqlalchemy.dialects.mysql import match
+from app import db
+from app.models import Post
+from app.utils.pagination import paginate_by_cursor
+
+
+post_fts = table("post_fts", column("rowid", Integer), column("title"), column("body"))
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def index_post(post):
+    """Add or refresh a post in the search index, inside the caller's transaction"""
+    if _dialect() == "sqlite":
+        unindex_post(post.id)
+        db.session.execute(post_fts.insert().values(rowid=post.id, title=post.title, body=post.body))
+
+
+def unindex_post(post_id):
+    if _dialect() == "sqlite":
+        db.session.execute(post_fts.delete().where(post_fts.c.rowid == post_id))
+
+
+def _fts5_query(q):
+    # Quote every term so user input can't be read as FTS5 query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in q.split())
+
+
+def _matches(q):
+    """Return the post id column, the score and the criterion of the index rows matching ``q``"""
+    if _dialect() == "sqlite":
+        fts = literal_column("post_fts")
+        return post_fts.c.rowid, type_coerce(-func.bm25(fts), Float), fts.op("MATCH")(_fts5_query(q))
+
+    score = type_coerce(match(Post.title, Post.body, against=q).in_natural_language_mode(), Float)
+    return Post.id, score, score > 0
+
+
+def search_posts(q, cursor, per_page, max_candidates):
+    """Return a page of posts matching ``q``, best match first, and the cursor of the next page.
+
+    Only the newest ``max_candidates`` matches are ranked, so terms found in most posts cost no
+    more than rarer ones. Ranking and paging run on the index alone, the posts of the page are
+    loaded afterwards. Posts of deleted accounts stay indexed until they are purged and are
+    dropped from their page then, which can come up short.
+    """
+    post_id, score, criterion = _matches(q)
+    cutoff = db.session.query(post_id)\
+                       .filter(criterion)\
+                       .order_by(post_id.desc())\
+                       .offset(max_candidates - 1)\
+                       .limit(1)\
+                       .scalar()
+
+    query = db.session.query(post_id.label("id"), score.label("score")).filter(criterion)
+    if cutoff is not None:
+        query = query.filter(post_id >= cutoff)
+
+    rows, next_cursor = paginate_by_cursor(
+        query,
+        [score, post_id],
+        lambda row: (row.score, row.id),
+        cursor,
+        per_page
+    )
+    posts = {post.id: post for post in Post.query.filter(Post.id.in_([row.id for row in rows]), Post.visible())}
+    return [posts[row.id] for row in rows if row.id in posts], next_cursor
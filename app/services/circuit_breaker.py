@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from app.services.errors import CircuitOpenError
+from app.services.errors import ProviderUnavailableError
+from app.utils import metrics
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breakers = {}
+_hedges = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+class CircuitBreaker:
+    """Fail fast while a remote provider is failing or slow.
+
+    Calls are tracked over a rolling window of ``window`` seconds. Once it holds at least
+    ``min_calls`` calls and ``failure_rate`` of them failed or took longer than ``slow_call``
+    seconds, the breaker opens and calls raise ``CircuitOpenError`` for ``open_seconds``. Then a
+    single probe call is let through, which closes the breaker again or re-opens it.
+    """
+
+    def __init__(self, name, message):
+        self.name = name
+        self.message = message
+        self.window = 60
+        self.min_calls = 10
+        self.failure_rate = 0.5
+        self.slow_call = 5
+        self.open_seconds = 30
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._state = CLOSED
+        self._opened_at = 0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+        self.hedged = 0
+
+    def call(self, fn, *args, hedge=False):
+        """Call ``fn(*args)``, which raises ``ProviderUnavailableError`` on failure.
+
+        With ``hedge``, a second identical call is started if the first one is slower than the
+        window's 95th percentile, and whichever succeeds first wins.
+        """
+        self._acquire()
+        started = time.perf_counter()
+        try:
+            result = self._hedged(fn, args) if hedge else fn(*args)
+        except Exception:
+            self._record(False, time.perf_counter() - started)
+            raise
+
+        elapsed = time.perf_counter() - started
+        self._record(elapsed <= self.slow_call, elapsed)
+        return result
+
+    def stats(self):
+        with self._lock:
+            self._prune()
+            calls = len(self._calls)
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+        p95 = self._p95()
+        return {
+            "state": self._state,
+            "calls": calls,
+            "failure_rate": round(failures / calls, 3) if calls else 0,
+            "p95_seconds": round(p95, 6) if p95 is not None else None,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "hedged": self.hedged
+        }
+
+    def _acquire(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+                self._probing = False
+
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+
+            self.rejected += 1
+        raise CircuitOpenError(self.message)
+
+    def _record(self, ok, elapsed):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+
+            self._calls.append((time.monotonic(), ok, elapsed))
+            self._prune()
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            if self._state == CLOSED and len(self._calls) >= self.min_calls and failures >= self.failure_rate * len(self._calls):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def _prune(self):
+        horizon = time.monotonic() - self.window
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+
+    def _p95(self):
+        with self._lock:
+            durations = sorted(elapsed for _, ok, elapsed in self._calls if ok)
+        if len(durations) < self.min_calls:
+            return None
+        return durations[int(len(durations) * 0.95) - 1]
+
+    def _hedged(self, fn, args):
+        delay = self._p95()
+        if delay is None:
+            return fn(*args)
+
+        pending = {_hedges.submit(fn, *args)}
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            self.hedged += 1
+            pending.add(_hedges.submit(fn, *args))
+
+        error = None
+        while done or pending:
+            for future in done:
+                try:
+                    return future.result()
+                except ProviderUnavailableError as e:
+                    error = e
+            done, pending = wait(pending, return_when=FIRST_COMPLETED) if pending else (set(), set())
+        raise error
+
+
+def breaker(name, message):
+    """Return the circuit breaker of a provider, creating it on first use"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, message)
+    return _breakers[name]
+
+
+def init_app(app):
+    for circuit in _breakers.values():
+        circuit.window = app.config["PROVIDER_BREAKER_WINDOW"]
+        circuit.min_calls = app.config["PROVIDER_BREAKER_MIN_CALLS"]
+        circuit.failure_rate = app.config["PROVIDER_BREAKER_FAILURE_RATE"]
+        circuit.slow_call = app.config["PROVIDER_BREAKER_SLOW_CALL"]
+        circuit.open_seconds = app.config["PROVIDER_BREAKER_OPEN_SECONDS"]
+    metrics.register("circuit_breakers", lambda: {name: circuit.stats() for name, circuit in _breakers.items()})
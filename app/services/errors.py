@@ -0,0 +1,6 @@
+class ProviderUnavailableError(Exception):
+    """Raised when an identity provider doesn't answer in time or answers with garbage"""
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """Raised without calling an identity provider while its circuit breaker is open"""
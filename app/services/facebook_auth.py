@@ -1,5 +1,78 @@
+import hashlib
+import threading
 import requests
+from cachetools import TTLCache
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from app.services.circuit_breaker import breaker
+from app.services.errors import ProviderUnavailableError
+from app.utils import metrics
+
+
+_lock = threading.Lock()
+_session = None
+_verified = None
+_stats = {"hits": 0, "misses": 0, "failures": 0}
+_breaker = breaker("facebook", "Facebook is unavailable")
+
+metrics.register("facebook_auth", lambda: dict(_stats, cached=len(_verified) if _verified is not None else 0))
+
+
+def _client():
+    """Return this process's pooled keep-alive session and verified-token cache, creating them on first use"""
+    global _session, _verified
+
+    if _session is None:
+        with _lock:
+            if _session is None:
+                config = current_app.config
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["FACEBOOK_POOL_SIZE"])
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _verified = TTLCache(maxsize=config["FACEBOOK_TOKEN_CACHE_SIZE"], ttl=config["FACEBOOK_TOKEN_CACHE_TTL"])
+                _session = session
+    return _session, _verified
+
+
+def _fetch(session, url, access_token, timeout):
+    try:
+        return session.get(
+            url,
+            params={"fields": "name,email", "locale": "en_US", "suppress_http_code": 1},
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=timeout
+        ).json()
+    except (requests.RequestException, ValueError) as e:
+        _stats["failures"] += 1
+        raise ProviderUnavailableError("Facebook is unavailable") from e
 
 
 def get_user(access_token):
-    return requests.get(f"https://graph.facebook.com/v2.3/me?access_token={access_token}&fields=name%2Cemail&locale=en_US&method=get&pretty=0&sdk=joey&suppress_http_code=1").json()
+    """Return the Graph API ``/me`` response of the token's user, or the Graph API error.
+
+    Successful responses are cached for ``FACEBOOK_TOKEN_CACHE_TTL`` seconds under a hash of the
+    token, so retried logins don't call Facebook again. Raises ``ProviderUnavailableError`` when
+    the Graph API can't be reached within ``FACEBOOK_TIMEOUT`` or its circuit breaker is open.
+    With ``FACEBOOK_HEDGING``, slow calls are hedged with a second one.
+    """
+    session, verified = _client()
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+
+    with _lock:
+        user = verified.get(key)
+    if user is not None:
+        _stats["hits"] += 1
+        return user
+    _stats["misses"] += 1
+
+    config = current_app.config
+    user = _breaker.call(
+        _fetch, session, f"{config['FACEBOOK_GRAPH_URL']}/me", access_token, config["FACEBOOK_TIMEOUT"],
+        hedge=config["FACEBOOK_HEDGING"]
+    )
+
+    if "error" not in user:
+        with _lock:
+            verified[key] = user
+    return user
@@ -1,16 +1,198 @@
-from firebase_admin import auth
+import hashlib
+import re
+import threading
+import time
+import requests
+from cachetools import TTLCache
+from flask import current_app
+from google.auth import jwt
+from app.services.circuit_breaker import breaker
+from app.services.errors import ProviderUnavailableError
+from app.utils import metrics
+
+
+CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+_breaker = breaker("google", "Google is unavailable")
+
+
+def _fetch_certs(timeout):
+    try:
+        resp = requests.get(CERTS_URL, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json(), resp.headers.get("Cache-Control", "")
+    except (requests.RequestException, ValueError) as e:
+        raise ProviderUnavailableError("Google is unavailable") from e
+
+
+class CertCache:
+    """Google's ID token signing certificates, refreshed in the background before they expire.
+
+    The certificates are kept for as long as the ``Cache-Control: max-age`` of the response
+    allows and re-fetched shortly before that, so verifying a token never waits on Google
+    unless the background refresh has failed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._timer = None
+        self.timeout = 5
+        self.fetches = 0
+        self.failures = 0
+        self.fetch_seconds = 0
+
+    def get(self):
+        certs = self._certs
+        if certs is None or time.time() >= self._expires_at:
+            certs = self.refresh()
+        return certs
+
+    def refresh(self):
+        with self._lock:
+            # Another thread may have refreshed them while this one waited
+            if self._certs is not None and time.time() < self._refresh_at:
+                return self._certs
+
+            started = time.perf_counter()
+            try:
+                certs, cache_control = _breaker.call(_fetch_certs, self.timeout)
+            except ProviderUnavailableError:
+                self.failures += 1
+                self._schedule(60)
+                if self._certs is not None and time.time() < self._expires_at:
+                    return self._certs
+                raise
+            finally:
+                self.fetches += 1
+                self.fetch_seconds += time.perf_counter() - started
+
+            max_age = re.search(r"max-age=(\d+)", cache_control)
+            max_age = int(max_age.group(1)) if max_age else 3600
+            refresh_in = max_age - min(max_age / 10, 300)
+            self._certs = certs
+            self._expires_at = time.time() + max_age
+            self._refresh_at = time.time() + refresh_in
+            self._schedule(refresh_in)
+            return certs
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "fetch_seconds": round(self.fetch_seconds, 6),
+            "expires_in": max(int(self._expires_at - time.time()), 0)
+        }
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 1), self._refresh_quietly)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except ProviderUnavailableError:
+            pass
+
+
+certs = CertCache()
+_firebase_lock = threading.Lock()
+_claims_lock = threading.Lock()
+_claims = None
+_stats = {"verifications": 0, "verify_seconds": 0, "verify_seconds_max": 0, "hits": 0, "rejected": 0}
+
+
+def stats():
+    return dict(
+        _stats,
+        verify_seconds=round(_stats["verify_seconds"], 6),
+        verify_seconds_max=round(_stats["verify_seconds_max"], 6),
+        certs=certs.stats()
+    )
+
+
+metrics.register("google_auth", stats)
+
+
+def init_app(app):
+    global _claims
+
+    certs.timeout = app.config["GOOGLE_CERTS_TIMEOUT"]
+    _claims = TTLCache(maxsize=app.config["GOOGLE_TOKEN_CACHE_SIZE"], ttl=app.config["GOOGLE_TOKEN_CACHE_TTL"])
+
+    if not app.testing:
+        # Fetched in the background once the app serves, so that neither a slow Google nor CLI
+        # commands like ``flask db upgrade`` wait on it
+        @app.before_first_request
+        def fetch_certs():
+            threading.Thread(target=certs._refresh_quietly, name="google-certs", daemon=True).start()
+
+
+def _firebase_app():
+    """Return the Firebase app, initialized on first use so that workers start without the SDK"""
+    import firebase_admin
+    from firebase_admin import credentials
+
+    with _firebase_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            return firebase_admin.initialize_app(credentials.Certificate(current_app.config["FIREBASE_SDK_KEY"]))
+
+
+def _verify(access_token):
+    project_id = _firebase_app().project_id
+    claims = jwt.decode(access_token, certs=certs.get(), audience=project_id)
+    if claims.get("iss") != f"https://securetoken.google.com/{project_id}" or not claims.get("sub"):
+        raise ValueError("Invalid Firebase ID token")
+
+    claims["uid"] = claims["sub"]
+    return claims
 
 
 def get_user(access_token):
+    """Return the claims of a Firebase ID token, or ``None`` if it isn't valid.
+
+    Verified claims are cached under a hash of the token until ``GOOGLE_TOKEN_CACHE_TTL`` or the
+    token's own ``exp``, whichever comes first. Raises ``ProviderUnavailableError`` when Google's
+    certificates can't be fetched.
+    """
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    with _claims_lock:
+        claims = _claims.get(key)
+    if claims is not None and claims["exp"] > time.time():
+        _stats["hits"] += 1
+        return claims
+
+    started = time.perf_counter()
     try:
-        return auth.verify_id_token(access_token)
-    except:
-        return None
+        claims = _verify(access_token)
+    except ValueError:
+        _stats["rejected"] += 1
+        claims = None
+    finally:
+        elapsed = time.perf_counter() - started
+        _stats["verifications"] += 1
+        _stats["verify_seconds"] += elapsed
+        _stats["verify_seconds_max"] = max(_stats["verify_seconds_max"], elapsed)
+        current_app.logger.debug(f"Verified Google ID token in {elapsed * 1000:.1f} ms")
+
+    if claims is not None:
+        with _claims_lock:
+            _claims[key] = claims
+    return claims
 
 
 def delete_user(uid):
+    from firebase_admin import auth
+
     try:
-        auth.delete_user(uid)
+        auth.delete_user(uid, app=_firebase_app())
         return 0
     except:
         return 1
@@ -0,0 +1,64 @@
+import threading
+from cachetools import TTLCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.models import User
+from app.utils import metrics
+
+
+class UserCache:
+    """Bounded TTL and LRU cache of the users behind access tokens, so requests skip a SELECT.
+
+    Entries are snapshots of a user's columns, merged into the request's session without a query.
+    Changes made by this worker invalidate their entry. Changes made by other workers, including
+    deleting the user, show up after at most ``USER_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self):
+        self._cache = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        if app.config["USER_CACHE_SIZE"]:
+            self._cache = TTLCache(maxsize=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"])
+        metrics.register("user_cache", self.stats)
+
+    def stats(self):
+        return {
+            "capacity": self._cache.maxsize if self._cache is not None else 0,
+            "size": len(self._cache) if self._cache is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def get(self, user_id):
+        """Return the user attached to the current session, or ``None`` if it doesn't exist"""
+        if self._cache is None:
+            return User.query.filter_by(id=user_id, deleted_at=None).first()
+
+        with self._lock:
+            values = self._cache.get(user_id)
+
+        if values is None:
+            self.misses += 1
+            user = User.query.filter_by(id=user_id, deleted_at=None).first()
+            if user is not None:
+                with self._lock:
+                    self._cache[user_id] = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+            return user
+
+        self.hits += 1
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        if self._cache is not None:
+            with self._lock:
+                self._cache.pop(user_id, None)
+
+
+user_cache = UserCache()
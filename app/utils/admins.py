@@ -0,0 +1,9 @@
+from flask import current_app
+from app.models import AuthIdentity
+
+
+def is_admin(user_id):
+    """Return whether one of the user's login emails is in ``ADMINS``"""
+    return AuthIdentity.query\
+                       .filter(AuthIdentity.user_id == user_id, AuthIdentity.email.in_(current_app.config["ADMINS"]))\
+                       .first() is not None
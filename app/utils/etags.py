@@ -0,0 +1,24 @@
+from flask import request
+from werkzeug.http import quote_etag
+
+
+def make_etag(version, *parts):
+    """Build a strong ETag whose first component is the row version checked by If-Match"""
+    return ".".join(str(part) for part in (version, *parts))
+
+
+def headers(etag):
+    return {"ETag": quote_etag(etag)}
+
+
+def matches_if_none_match(etag):
+    return etag in request.if_none_match
+
+
+def matches_if_match(version):
+    """Whether the request has no If-Match or one of its ETags was made for ``version``"""
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return True
+
+    return any(tag.split(".", 1)[0] == str(version) for tag in if_match.as_set())
@@ -1,9 +1,13 @@
-def ok(json):
-    return json, 200
+def ok(json, headers=None):
+    return json, 200, headers
 
 
-def created(json):
-    return json, 201
+def created(json, headers=None):
+    return json, 201, headers
+
+
+def not_modified(headers):
+    return None, 304, headers
 
 
 def bad_request(json):
@@ -22,5 +26,17 @@ def not_found(json):
     return json, 404
 
 
+def conflict(json):
+    return json, 409
+
+
+def precondition_failed(json):
+    return json, 412
+
+
 def internal_server_error(json):
     return json, 500
+
+
+def service_unavailable(json):
+    return json, 503
@@ -9,7 +9,8 @@ class RequestFormatter(logging.Formatter):
             record.url = request.url
             record.remote_addr = request.remote_addr
         else:
-            record.url = None
-            record.remote_addr = None
+            # Records queued from a request thread carry its request already
+            record.url = getattr(record, "url", None)
+            record.remote_addr = getattr(record, "remote_addr", None)
 
         return super().format(record)
@@ -0,0 +1,168 @@
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from logging.handlers import SMTPHandler
+from flask import has_request_context
+from flask import request
+from app.utils import metrics
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops records rather than block when its queue is full, and counts them.
+
+    The request is captured while the record is still in the request's thread, so formatters
+    running on the listener thread can report it.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if has_request_context():
+            record.url = request.url
+            record.remote_addr = request.remote_addr
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DigestSMTPHandler(SMTPHandler):
+    """SMTPHandler that mails the records of every ``interval`` seconds together as one digest.
+
+    The first record after a quiet period is mailed right away. Those following it are collected
+    and mailed when the interval is over, keeping at most ``max_records`` of them.
+    """
+
+    def __init__(self, *args, interval=300, max_records=50, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.max_records = max_records
+        self._records = []
+        self._omitted = 0
+        self._last_sent = 0
+        self._timer = None
+        self.digests = 0
+        self.sent = 0
+        self.omitted = 0
+        self.failures = 0
+
+    def emit(self, record):
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self.lock:
+            if len(self._records) < self.max_records:
+                self._records.append(text)
+            else:
+                self._omitted += 1
+
+            wait = self._last_sent + self.interval - time.monotonic()
+            if wait <= 0:
+                self._send()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self._records:
+                self._send()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+    def _send(self):
+        records, omitted = self._records, self._omitted
+        self._records, self._omitted = [], 0
+        self._last_sent = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        body = "\n\n".join(records)
+        if omitted:
+            body += f"\n\n... and {omitted} more"
+        subject = self.subject if len(records) + omitted == 1 else f"{self.subject} ({len(records) + omitted} errors)"
+
+        msg = EmailMessage()
+        msg["From"] = self.fromaddr
+        msg["To"] = ",".join(self.toaddrs)
+        msg["Subject"] = subject
+        msg["Date"] = formatdate()
+        msg.set_content(body)
+
+        try:
+            smtp = smtplib.SMTP(self.mailhost, self.mailport or smtplib.SMTP_PORT, timeout=self.timeout)
+            try:
+                if self.username:
+                    if self.secure is not None:
+                        smtp.ehlo()
+                        smtp.starttls(*self.secure)
+                        smtp.ehlo()
+                    smtp.login(self.username, self.password)
+                smtp.send_message(msg)
+            finally:
+                smtp.quit()
+        except (OSError, smtplib.SMTPException):
+            # Mailing errors can't be logged without feeding this handler again
+            self.failures += 1
+            return
+
+        self.digests += 1
+        self.sent += len(records)
+        self.omitted += omitted
+
+
+def queue_handler(handlers, size):
+    """Return a handler queueing records for ``handlers``, which run on a background listener thread.
+
+    Each handler keeps its own level. Up to ``size`` records wait in the queue, those logged
+    while it is full are dropped. The queue is drained when the process exits.
+    """
+    handler = BoundedQueueHandler(queue.Queue(size))
+    listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def stop():
+        try:
+            listener.stop()
+        except queue.Full:
+            pass
+        for target in handlers:
+            target.close()
+
+    def stats():
+        snapshot = {
+            "queued": handler.queue.qsize(),
+            "capacity": size,
+            "dropped": handler.dropped
+        }
+        for target in handlers:
+            if isinstance(target, DigestSMTPHandler):
+                snapshot.update(
+                    digests=target.digests,
+                    mailed=target.sent,
+                    omitted=target.omitted,
+                    mail_failures=target.failures
+                )
+        return snapshot
+
+    atexit.register(stop)
+    metrics.register("logging", stats)
+    return handler
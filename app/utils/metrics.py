@@ -0,0 +1,10 @@
+_collectors = {}
+
+
+def register(name, collector):
+    """Expose the dict returned by ``collector()`` under ``name`` in the metrics snapshot"""
+    _collectors[name] = collector
+
+
+def snapshot():
+    return {name: collector() for name, collector in _collectors.items()}
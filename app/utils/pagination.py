@@ -0,0 +1,62 @@
+import json
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from datetime import datetime
+from sqlalchemy import and_
+from sqlalchemy import or_
+
+
+def encode_cursor(values):
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types=None):
+    """Decode a cursor made by ``encode_cursor``, checking its values against ``types`` if given"""
+    try:
+        payload = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list):
+            raise ValueError("Invalid cursor")
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if types is not None:
+        if len(values) != len(types) or not all(_is_a(value, type_) for value, type_ in zip(values, types)):
+            raise ValueError("Invalid cursor")
+    return values
+
+
+def _is_a(value, type_):
+    if isinstance(value, bool):
+        return type_ is bool
+    if type_ is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, type_)
+
+
+def _before(columns, values):
+    """Lexicographic ``columns < values``, spelled out so MySQL can use a range scan on the index"""
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, _before(columns[1:], values[1:])))
+
+
+def paginate_by_cursor(query, columns, key, cursor, per_page):
+    """Keyset-paginate ``query`` in descending ``columns`` order.
+
+    ``key`` maps a row to its values for ``columns`` and ``cursor`` is the
+    opaque string returned for the previous page (or ``None`` for the first).
+    Returns the rows of the page and the cursor of the next one, if any.
+    """
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in columns])
+        query = query.filter(_before(columns, values))
+
+    rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    return rows, encode_cursor(key(rows[-1]))
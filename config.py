@@ -12,19 +12,69 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', '') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Only applied to MySQL, e.g. "mysqldb" for mysqlclient or "pymysql"
+    DATABASE_DRIVER = os.getenv("DATABASE_DRIVER")
+    # Reads of GET requests go to the replica when it is set, and stay on the primary for
+    # REPLICA_STICKY_SECONDS after the same user's last write
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    REPLICA_STICKY_SIZE = int(os.getenv("REPLICA_STICKY_SIZE", 10000))
+    # Pool options are dropped for SQLite, whose pools don't take them
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 280)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")
+    }
     POSTS_PER_PAGE = 10
     LIKES_PER_PAGE = 5
     BODY_OVERVIEW_LENGTH = 100
+    # Search ranks only the newest matches of a query, which bounds the cost of common terms
+    SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 5000))
+    LIKE_COUNTER_SLOTS = int(os.getenv("LIKE_COUNTER_SLOTS", 8))
+    FEED_BUFFER_SIZE = int(os.getenv("FEED_BUFFER_SIZE", 100))
+    FEED_BUFFER_TTL = int(os.getenv("FEED_BUFFER_TTL", 5))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 30))
+    PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 500))
+    PURGE_INTERVAL = int(os.getenv("PURGE_INTERVAL", 60))
+    LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "").lower() in ("1", "true", "yes")
+    LIKE_BUFFER_FLUSH_INTERVAL = int(os.getenv("LIKE_BUFFER_FLUSH_INTERVAL", 50))
+    LIKE_BUFFER_MAX_EVENTS = int(os.getenv("LIKE_BUFFER_MAX_EVENTS", 500))
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY") or "123325145"
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=10)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     FIREBASE_SDK_KEY = os.getenv("FIREBASE_SDK_KEY")
+    FACEBOOK_GRAPH_URL = os.getenv("FACEBOOK_GRAPH_URL", "https://graph.facebook.com/v2.3")
+    FACEBOOK_TIMEOUT = (
+        float(os.getenv("FACEBOOK_CONNECT_TIMEOUT", 3.05)),
+        float(os.getenv("FACEBOOK_READ_TIMEOUT", 5))
+    )
+    FACEBOOK_POOL_SIZE = int(os.getenv("FACEBOOK_POOL_SIZE", 10))
+    FACEBOOK_TOKEN_CACHE_SIZE = int(os.getenv("FACEBOOK_TOKEN_CACHE_SIZE", 1024))
+    FACEBOOK_TOKEN_CACHE_TTL = int(os.getenv("FACEBOOK_TOKEN_CACHE_TTL", 60))
+    FACEBOOK_HEDGING = os.getenv("FACEBOOK_HEDGING", "").lower() in ("1", "true", "yes")
+    GOOGLE_CERTS_TIMEOUT = float(os.getenv("GOOGLE_CERTS_TIMEOUT", 5))
+    GOOGLE_TOKEN_CACHE_SIZE = int(os.getenv("GOOGLE_TOKEN_CACHE_SIZE", 1024))
+    GOOGLE_TOKEN_CACHE_TTL = int(os.getenv("GOOGLE_TOKEN_CACHE_TTL", 300))
+    PROVIDER_BREAKER_WINDOW = int(os.getenv("PROVIDER_BREAKER_WINDOW", 60))
+    PROVIDER_BREAKER_MIN_CALLS = int(os.getenv("PROVIDER_BREAKER_MIN_CALLS", 10))
+    PROVIDER_BREAKER_FAILURE_RATE = float(os.getenv("PROVIDER_BREAKER_FAILURE_RATE", 0.5))
+    PROVIDER_BREAKER_SLOW_CALL = float(os.getenv("PROVIDER_BREAKER_SLOW_CALL", 4))
+    PROVIDER_BREAKER_OPEN_SECONDS = int(os.getenv("PROVIDER_BREAKER_OPEN_SECONDS", 30))
     MAIL_SERVER = os.getenv("MAIL_SERVER")
     MAIL_PORT = int(os.getenv("MAIL_PORT", 25))
     MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", None)
     MAIL_USERNAME = os.getenv("MAIL_USERNAME")
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     ADMINS = os.getenv("ADMINS").split(",")
+    # Errors are mailed at most once per MAIL_DIGEST_INTERVAL seconds, batched into one digest
+    MAIL_DIGEST_INTERVAL = int(os.getenv("MAIL_DIGEST_INTERVAL", 300))
+    MAIL_DIGEST_MAX_RECORDS = int(os.getenv("MAIL_DIGEST_MAX_RECORDS", 50))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", 10))
     PROPAGATE_EXCEPTIONS = True
     SWAGGER = {
         'uiversion': 3,
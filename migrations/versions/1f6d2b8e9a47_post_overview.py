@@ -0,0 +1,52 @@
+"""add precomputed body overview to post
+
+Revision ID: 1f6d2b8e9a47
+Revises: e71b0a9f3c25
+Create Date: 2026-10-18 12:20:44.903516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f6d2b8e9a47'
+down_revision = 'e71b0a9f3c25'
+branch_labels = None
+depends_on = None
+
+
+# BODY_OVERVIEW_LENGTH at the time of this migration, run `flask recompute-overviews` if it changed
+OVERVIEW_LENGTH = 100
+BATCH_SIZE = 1000
+
+
+def _overview(body):
+    return f"{body[:OVERVIEW_LENGTH]}..." if len(body) > OVERVIEW_LENGTH else body
+
+
+def upgrade():
+    op.add_column('post', sa.Column('overview', sa.Text(), nullable=True))
+
+    post = sa.table('post', sa.column('id', sa.Integer()), sa.column('body', sa.Text()), sa.column('overview', sa.Text()))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(post.c.id, post.c.body).where(post.c.id > last_id).order_by(post.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            post.update().where(post.c.id == sa.bindparam('post_id')).values(overview=sa.bindparam('new_overview')),
+            [{'post_id': post_id, 'new_overview': _overview(body)} for post_id, body in rows]
+        )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.alter_column('overview', existing_type=sa.Text(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('overview')
@@ -0,0 +1,24 @@
+"""add (created_at, id) index on post for keyset pagination
+
+Revision ID: 3c9e1d7a52f4
+Revises: 8a1f9364b3bb
+Create Date: 2026-10-18 09:12:40.118231
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1d7a52f4'
+down_revision = '8a1f9364b3bb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_post_created_at_id', 'post', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_post_created_at_id', table_name='post')
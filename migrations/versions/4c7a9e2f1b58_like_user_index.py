@@ -0,0 +1,24 @@
+"""add (user_id, liked_at, post_id) index on like
+
+Revision ID: 4c7a9e2f1b58
+Revises: b83e4f1a6d02
+Create Date: 2026-10-18 14:52:27.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c7a9e2f1b58'
+down_revision = 'b83e4f1a6d02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_like_user_id_liked_at', 'like', ['user_id', 'liked_at', 'post_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_like_user_id_liked_at', table_name='like')
@@ -0,0 +1,36 @@
+"""add slotted like counters for posts
+
+Revision ID: 5b2f8e0c41d7
+Revises: 3c9e1d7a52f4
+Create Date: 2026-10-18 10:03:11.492017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f8e0c41d7'
+down_revision = '3c9e1d7a52f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    counter = op.create_table('post_like_counter',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.PrimaryKeyConstraint('post_id', 'slot')
+    )
+
+    like = sa.table('like', sa.column('post_id', sa.Integer()))
+    op.execute(counter.insert().from_select(
+        ['post_id', 'slot', 'count'],
+        sa.select(like.c.post_id, sa.literal(0), sa.func.count()).group_by(like.c.post_id)
+    ))
+
+
+def downgrade():
+    op.drop_table('post_like_counter')
@@ -0,0 +1,33 @@
+"""add full-text search index over post title and body
+
+Revision ID: 6a0c5e2d7f19
+Revises: 1f6d2b8e9a47
+Create Date: 2026-10-18 13:05:26.551870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0c5e2d7f19'
+down_revision = '1f6d2b8e9a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ix_post_fulltext', 'post', ['title', 'body'], unique=False, mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE post_fts USING fts5(title, body)')
+        op.execute('INSERT INTO post_fts (rowid, title, body) SELECT id, title, body FROM post')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ix_post_fulltext', table_name='post')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE post_fts')
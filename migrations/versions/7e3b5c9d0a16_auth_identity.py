@@ -0,0 +1,64 @@
+"""add auth_identity and index provider auth rows by user
+
+Revision ID: 7e3b5c9d0a16
+Revises: 4c7a9e2f1b58
+Create Date: 2026-10-18 16:20:48.903115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3b5c9d0a16'
+down_revision = '4c7a9e2f1b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    identity = op.create_table('auth_identity',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('provider', sa.String(length=16), nullable=False),
+    sa.Column('email', sqlalchemy_utils.types.email.EmailType(length=255), nullable=False),
+    sa.Column('provider_user_id', sa.String(length=128), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('provider', 'provider_user_id', name='uq_auth_identity_provider_user_id')
+    )
+    op.create_index(op.f('ix_auth_identity_email'), 'auth_identity', ['email'], unique=True)
+    op.create_index(op.f('ix_auth_identity_user_id'), 'auth_identity', ['user_id'], unique=False)
+    op.create_index(op.f('ix_facebook_auth_user_id'), 'facebook_auth', ['user_id'], unique=False)
+    op.create_index(op.f('ix_google_auth_user_id'), 'google_auth', ['user_id'], unique=False)
+
+    facebook_auth = sa.table('facebook_auth',
+        sa.column('email', sa.String()),
+        sa.column('fb_user_id', sa.String()),
+        sa.column('user_id', sa.Integer())
+    )
+    google_auth = sa.table('google_auth',
+        sa.column('email', sa.String()),
+        sa.column('gg_user_id', sa.String()),
+        sa.column('user_id', sa.Integer())
+    )
+    columns = ['provider', 'email', 'provider_user_id', 'user_id']
+    op.execute(identity.insert().from_select(
+        columns,
+        sa.select(sa.literal('facebook'), facebook_auth.c.email, facebook_auth.c.fb_user_id, facebook_auth.c.user_id)
+    ))
+    # Registration refused emails already registered from Facebook, skip any that slipped through
+    op.execute(identity.insert().from_select(
+        columns,
+        sa.select(sa.literal('google'), google_auth.c.email, google_auth.c.gg_user_id, google_auth.c.user_id)
+          .where(~sa.exists().where(facebook_auth.c.email == google_auth.c.email))
+    ))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_google_auth_user_id'), table_name='google_auth')
+    op.drop_index(op.f('ix_facebook_auth_user_id'), table_name='facebook_auth')
+    op.drop_index(op.f('ix_auth_identity_user_id'), table_name='auth_identity')
+    op.drop_index(op.f('ix_auth_identity_email'), table_name='auth_identity')
+    op.drop_table('auth_identity')
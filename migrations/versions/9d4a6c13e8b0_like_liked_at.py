@@ -0,0 +1,37 @@
+"""add liked_at to like
+
+Revision ID: 9d4a6c13e8b0
+Revises: 5b2f8e0c41d7
+Create Date: 2026-10-18 10:47:52.630114
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a6c13e8b0'
+down_revision = '5b2f8e0c41d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('like', sa.Column('liked_at', sa.DateTime(), nullable=True))
+
+    # Existing likes have no timestamp, the post's creation time is the best lower bound we have
+    like = sa.table('like', sa.column('post_id', sa.Integer()), sa.column('liked_at', sa.DateTime()))
+    post = sa.table('post', sa.column('id', sa.Integer()), sa.column('created_at', sa.DateTime()))
+    created_at = sa.select(post.c.created_at).where(post.c.id == like.c.post_id).scalar_subquery()
+    op.execute(like.update().values(liked_at=sa.func.coalesce(created_at, datetime.utcnow())))
+
+    with op.batch_alter_table('like') as batch_op:
+        batch_op.alter_column('liked_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_like_post_id_liked_at', 'like', ['post_id', 'liked_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_like_post_id_liked_at', table_name='like')
+    with op.batch_alter_table('like') as batch_op:
+        batch_op.drop_column('liked_at')
@@ -0,0 +1,27 @@
+"""add deleted_at to post
+
+Revision ID: a6e1c3f8b924
+Revises: d25f7a4c8e31
+Create Date: 2026-10-18 17:48:02.557310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e1c3f8b924'
+down_revision = 'd25f7a4c8e31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('post', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_post_deleted_at'), 'post', ['deleted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_post_deleted_at'), table_name='post')
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,24 @@
+"""add (author_id, created_at, id) index on post
+
+Revision ID: b83e4f1a6d02
+Revises: 6a0c5e2d7f19
+Create Date: 2026-10-18 13:41:09.734662
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e4f1a6d02'
+down_revision = '6a0c5e2d7f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_post_author_id_created_at_id', 'post', ['author_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_post_author_id_created_at_id', table_name='post')
@@ -0,0 +1,27 @@
+"""add deleted_at to user
+
+Revision ID: d25f7a4c8e31
+Revises: 7e3b5c9d0a16
+Create Date: 2026-10-18 17:05:36.120954
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd25f7a4c8e31'
+down_revision = '7e3b5c9d0a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_user_deleted_at'), 'user', ['deleted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_deleted_at'), table_name='user')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,27 @@
+"""add content_version to user
+
+Revision ID: e4b2d8f6a137
+Revises: a6e1c3f8b924
+Create Date: 2026-10-18 09:12:40.318275
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b2d8f6a137'
+down_revision = 'a6e1c3f8b924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('content_version', sa.Integer(), nullable=False, server_default='1'))
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('content_version', existing_type=sa.Integer(), existing_nullable=False, server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('content_version')
@@ -0,0 +1,29 @@
+"""add row versions to post and user and like-state tokens to counters
+
+Revision ID: e71b0a9f3c25
+Revises: 9d4a6c13e8b0
+Create Date: 2026-10-18 11:38:05.277410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b0a9f3c25'
+down_revision = '9d4a6c13e8b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, column, initial in (('user', 'version', '1'), ('post', 'version', '1'), ('post_like_counter', 'changes', '0')):
+        op.add_column(table, sa.Column(column, sa.Integer(), nullable=False, server_default=initial))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Integer(), existing_nullable=False, server_default=None)
+
+
+def downgrade():
+    for table, column in (('post_like_counter', 'changes'), ('post', 'version'), ('user', 'version')):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
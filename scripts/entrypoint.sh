@@ -0,0 +1,10 @@
+#!/bin/sh
+# Waits a bounded time for the database, brings the schema up to date once, then starts the server
+set -e
+
+export FLASK_APP="${FLASK_APP:-app}"
+
+flask wait-for-db --attempts "${DB_WAIT_ATTEMPTS:-20}" --interval "${DB_WAIT_INTERVAL:-3}"
+flask db upgrade
+
+exec "$@"
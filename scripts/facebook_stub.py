@@ -0,0 +1,54 @@
+"""Local stand-in for the Graph API ``/me`` endpoint, for tests and benchmarks.
+
+Run it with ``python scripts/facebook_stub.py [--port 8081] [--latency 0.05]`` and point
+``FACEBOOK_GRAPH_URL`` at ``http://localhost:8081``. Every bearer token is valid and belongs to
+the user ``<token>@example.com``, except ``invalid`` which is rejected like an expired token.
+"""
+import argparse
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+class GraphHandler(BaseHTTPRequestHandler):
+    latency = 0
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        token = self.headers.get("Authorization", "").partition("Bearer ")[2]
+
+        if not self.path.startswith("/me") or not token or token == "invalid":
+            body = {"error": {"message": "Invalid OAuth access token.", "type": "OAuthException", "code": 190}}
+        else:
+            body = {
+                "id": str(int(hashlib.sha256(token.encode()).hexdigest(), 16) % 10 ** 15),
+                "name": token,
+                "email": f"{token}@example.com"
+            }
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0, help="Seconds to wait before answering")
+    args = parser.parse_args()
+
+    GraphHandler.latency = args.latency
+    ThreadingHTTPServer(("localhost", args.port), GraphHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
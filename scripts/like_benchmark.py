@@ -0,0 +1,134 @@
+"""Like throughput benchmark, comparing the like buffer with a commit per request.
+
+Run it from the repository root with ``python scripts/like_benchmark.py [--likes 2000] [--threads 16]``.
+Each mode runs in a fresh interpreter against a scratch SQLite database, or the empty schema at
+``--database-url``. Every thread likes the same post as different users through the API, the
+way a viral post is liked. The buffered run is timed until its last flush has committed, and both
+runs check that the like table and the post's counter end up with one like per request.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("per-request", "buffer")
+
+
+def run_mode(mode, likes, threads, database_url):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("ADMINS", "admin@example.com")
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app import counters
+    from app import db
+    from app.like_buffer import like_buffer
+    from app.models import Like
+    from app.models import Post
+    from app.models import User
+    from config import TestConfig
+
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        LIKE_BUFFER_ENABLED = mode == "buffer"
+        FEED_BUFFER_SIZE = 0
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        author = User(name="author")
+        post = Post(title="viral", body="body", overview="body", author=author)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+        db.session.execute(User.__table__.insert(), [{"name": f"liker{i}", "version": 1} for i in range(likes)])
+        db.session.commit()
+        user_ids = [user_id for user_id, in db.session.query(User.id).filter(User.id != author.id)]
+        headers = [{"Authorization": f"Bearer {create_access_token(identity=user_id)}"} for user_id in user_ids]
+
+    latencies = []
+    failures = []
+
+    def like(chunk):
+        client = app.test_client()
+        for header in chunk:
+            started = time.perf_counter()
+            status = client.put(f"/api/v1/users/me/likes/{post_id}", headers=header).status_code
+            latencies.append(time.perf_counter() - started)
+            if status != 201:
+                failures.append(status)
+
+    workers = [threading.Thread(target=like, args=(headers[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if like_buffer.enabled:
+        like_buffer.flush()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stored = Like.query.filter_by(post_id=post_id).count()
+        counted = counters.like_totals([post_id]).get(post_id, 0)
+
+    latencies.sort()
+    return {
+        "likes/s": likes / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "failed": len(failures),
+        "stored": stored,
+        "counted": counted,
+        "flushes": like_buffer.flushes
+    }
+
+
+def run_probe(mode, args):
+    scratch = None
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite:///{scratch.name}"
+
+    try:
+        out = subprocess.run(
+            [sys.executable, __file__, "--probe", mode, "--likes", str(args.likes),
+             "--threads", str(args.threads), "--database-url", database_url],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        if scratch is not None:
+            os.remove(scratch.name)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--likes", type=int, default=2000, help="Likes per run, each by a different user")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--database-url", help="Empty database to use, a scratch SQLite file per mode by default")
+    parser.add_argument("--probe", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(run_mode(args.probe, args.likes, args.threads, args.database_url)))
+        return
+
+    results = {mode: run_probe(mode, args) for mode in MODES}
+    print(f"{'':<14}" + "".join(f"{mode:>14}" for mode in MODES))
+    for metric in results[MODES[0]]:
+        cells = "".join(f"{results[mode][metric]:>14.1f}" if isinstance(results[mode][metric], float)
+                        else f"{results[mode][metric]:>14}" for mode in MODES)
+        print(f"{metric:<14}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Search latency benchmark, to check that queries stay flat as the post table grows.
+
+Run it from the repository root with ``python scripts/search_benchmark.py [--sizes 10000,100000,1000000]``.
+Generated posts are added to a scratch SQLite database, or to the empty schema at
+``--database-url`` (e.g. a MySQL database brought up with ``flask db upgrade``), until the table
+reaches each size. Then the first and the second page of ``search_posts`` are timed for a common,
+a medium and a rare term, next to the ``LIKE '%term%'`` scan the full-text index replaces.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("ADMINS", "admin@example.com")
+
+from sqlalchemy import or_
+from app import create_app
+from app import db
+from app import search
+from app.models import Post
+from app.models import User
+from config import TestConfig
+
+
+VOCABULARY = 5000
+INSERT_BATCH = 10000
+
+
+def vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def add_posts(count, start, author_id, words, weights, rng):
+    """Add ``count`` posts whose words follow a Zipf-like distribution, the first word being the most common"""
+    created_at = datetime(2020, 1, 1)
+    for offset in range(0, count, INSERT_BATCH):
+        rows = []
+        for post_id in range(start + offset + 1, start + min(offset + INSERT_BATCH, count) + 1):
+            title = " ".join(rng.choices(words, weights, k=4))
+            body = " ".join(rng.choices(words, weights, k=60))
+            rows.append({
+                "id": post_id,
+                "title": title,
+                "body": body,
+                "overview": body[:100],
+                "created_at": created_at + timedelta(seconds=post_id),
+                "author_id": author_id,
+                "version": 1
+            })
+        db.session.execute(Post.__table__.insert(), rows)
+        if db.engine.dialect.name == "sqlite":
+            db.session.execute(
+                search.post_fts.insert(),
+                [{"rowid": row["id"], "title": row["title"], "body": row["body"]} for row in rows]
+            )
+        db.session.commit()
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def like_scan(term, per_page):
+    return Post.query.filter(or_(Post.title.like(f"%{term}%"), Post.body.like(f"%{term}%")), Post.visible())\
+                     .order_by(Post.id.desc())\
+                     .limit(per_page)\
+                     .all()
+
+
+def measure(term, per_page, max_candidates, repeat, skip_like):
+    def page(cursor):
+        return lambda: search.search_posts(term, cursor, per_page, max_candidates)
+
+    _, cursor = page(None)()
+    results = {
+        "first page": timed(page(None), repeat),
+        "second page": timed(page(cursor), repeat) if cursor else None,
+        "LIKE scan": None if skip_like else timed(lambda: like_scan(term, per_page), repeat)
+    }
+    db.session.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated table sizes")
+    parser.add_argument("--database-url", help="Empty database to fill, a scratch SQLite file by default")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of every query, the median is reported")
+    parser.add_argument("--like-limit", type=int, default=100000, help="Skip the LIKE scan above this size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.database_url = f"sqlite:///{scratch.name}"
+
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = args.database_url
+        FEED_BUFFER_SIZE = 0
+
+    app = create_app(BenchmarkConfig)
+    rng = random.Random(args.seed)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    terms = {"common": words[0], "medium": words[99], "rare": words[-1]}
+
+    try:
+        with app.app_context():
+            if scratch is not None:
+                db.create_all()
+            author = User(name="benchmark")
+            db.session.add(author)
+            db.session.commit()
+
+            per_page = app.config["POSTS_PER_PAGE"]
+            max_candidates = app.config["SEARCH_MAX_CANDIDATES"]
+            size = 0
+            print(f"{'posts':>9}  {'term':<8}{'first page':>12}{'second page':>13}{'LIKE scan':>11}  (median ms)")
+            for target in sorted(int(value) for value in args.sizes.split(",")):
+                started = time.perf_counter()
+                add_posts(target - size, size, author.id, words, weights, rng)
+                size = target
+                print(f"# filled to {size} posts in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+                for label, term in terms.items():
+                    results = measure(term, per_page, max_candidates, args.repeat, size > args.like_limit)
+                    cells = "".join(
+                        f"{value:>{width}.2f}" if value is not None else f"{'-':>{width}}"
+                        for value, width in zip(results.values(), (12, 13, 11))
+                    )
+                    print(f"{size:>9}  {label:<8}{cells}")
+    finally:
+        if scratch is not None:
+            os.remove(scratch.name)
+
+
+if __name__ == "__main__":
+    main()
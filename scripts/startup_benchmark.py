@@ -0,0 +1,81 @@
+"""Cold start benchmark of the app, to keep an eye on worker boot time.
+
+Run it from the repository root with ``python scripts/startup_benchmark.py [--runs 5] [--top 15]``,
+with the same environment as the server (``.env`` is loaded as usual). Every run starts a fresh
+interpreter and times importing the app, ``create_app()``, the first API request and the first
+request for the API docs. A final ``-X importtime`` run lists the slowest imports, cumulative
+times including the modules they import themselves.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json
+import time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get("/api/v1/metrics")
+first_request = time.perf_counter()
+client.get("/apispec_1.json")
+docs = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first_request": first_request - created,
+    "first_docs_request": docs - first_request
+}))
+"""
+
+
+def run_probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(top):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    print(f"{'phase':<20}{'median':>10}{'min':>10}{'max':>10}")
+    for phase in runs[0]:
+        times = [run[phase] for run in runs]
+        print(f"{phase:<20}{statistics.median(times):>10.3f}{min(times):>10.3f}{max(times):>10.3f}")
+    totals = [sum(run.values()) for run in runs]
+    print(f"{'total':<20}{statistics.median(totals):>10.3f}{min(totals):>10.3f}{max(totals):>10.3f}")
+
+    print("\nSlowest imports (cumulative seconds)")
+    for seconds, name in slowest_imports(args.top):
+        print(f"{seconds:>8.3f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
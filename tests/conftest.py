@@ -0,0 +1,68 @@
+import os
+
+os.environ.setdefault("ADMINS", "admin@example.com")
+
+import pytest
+from sqlalchemy import event
+from app import create_app
+from app import db
+from app.models import AuthIdentity
+from app.models import FacebookAuth
+from app.models import User
+from app.utils.tokens import create_tokens
+from config import TestConfig
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        FEED_BUFFER_SIZE = 0
+        USER_CACHE_SIZE = 0
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a Facebook user and return its id and Authorization header"""
+    def make_user(name):
+        with app.app_context():
+            user = User(name=name)
+            email = f"{name}@example.com"
+            db.session.add_all([
+                user,
+                FacebookAuth(fb_user_id=name, email=email, user=user),
+                AuthIdentity(provider="facebook", provider_user_id=name, email=email, user=user)
+            ])
+            db.session.commit()
+            return user.id, {"Authorization": f"Bearer {create_tokens(user)['access_token']}"}
+    return make_user
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return the number of SQL statements run by a call"""
+    def count_queries(fn):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return len(statements)
+    return count_queries
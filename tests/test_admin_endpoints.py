@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.mark.parametrize("url", ["/api/v1/metrics", "/api/v1/export"])
+def test_only_admins_read_metrics_and_exports(client, make_user, url):
+    _, admin = make_user("admin")
+    _, user = make_user("user")
+
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=user).status_code == 403
+    assert client.get(url, headers=admin).status_code == 200
@@ -0,0 +1,18 @@
+from sqlalchemy import create_engine
+from app import db_pool
+
+
+def test_pool_stats_come_from_its_events_and_survive_dispose(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=db_pool.InstrumentedQueuePool, pool_size=2)
+    db_pool.instrument(engine)
+
+    with engine.connect(), engine.connect():
+        busy = db_pool.engine_stats(engine)
+    engine.dispose()
+    with engine.connect():
+        pass
+    stats = db_pool.engine_stats(engine)
+
+    assert (busy["in_use"], busy["checkouts"], busy["checkins"]) == (2, 2, 0)
+    assert (stats["in_use"], stats["checkouts"], stats["checkins"], stats["connects"]) == (0, 3, 3, 3)
+    assert stats["timeouts"] == 0 and stats["wait_seconds"] > 0
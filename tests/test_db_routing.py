@@ -0,0 +1,94 @@
+import shutil
+import pytest
+from app import create_app
+from app import db
+from app import db_routing
+from app.models import User
+from config import TestConfig
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App whose GET requests read from a second SQLite file, brought up to date by ``replicate``"""
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DATABASE_REPLICA_URL = f"sqlite:///{tmp_path / 'replica.db'}"
+        REPLICA_STICKY_SECONDS = 60
+        FEED_BUFFER_SIZE = 0
+        USER_CACHE_SIZE = 0
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+    app.replicate = lambda: shutil.copyfile(tmp_path / "primary.db", tmp_path / "replica.db")
+    app.replicate()
+    yield app
+
+
+def _routing_stats(app):
+    with app.app_context():
+        return db_routing.stats()
+
+
+def test_reads_go_to_the_replica(app, client, make_user):
+    _, author = make_user("author")
+    _, reader = make_user("reader")
+    app.replicate()
+
+    post_id = client.post("/api/v1/posts", json={"title": "title", "body": "body"}, headers=author).json["id"]
+    before = _routing_stats(app)
+
+    # The replica hasn't caught up with the post yet
+    assert client.get(f"/api/v1/posts/{post_id}", headers=reader).status_code == 404
+    app.replicate()
+    assert client.get(f"/api/v1/posts/{post_id}", headers=reader).status_code == 200
+
+    after = _routing_stats(app)
+    assert after["replica_requests"] - before["replica_requests"] == 2
+    assert after["primary_requests"] == before["primary_requests"]
+
+
+def test_writers_read_their_writes_from_the_primary(app, client, make_user):
+    _, author = make_user("author")
+    app.replicate()
+
+    post_id = client.post("/api/v1/posts", json={"title": "title", "body": "body"}, headers=author).json["id"]
+    before = _routing_stats(app)
+
+    assert client.get(f"/api/v1/posts/{post_id}", headers=author).status_code == 200
+
+    after = _routing_stats(app)
+    assert after["sticky_requests"] - before["sticky_requests"] == 1
+    assert after["primary_requests"] - before["primary_requests"] == 1
+    assert after["replica_requests"] == before["replica_requests"]
+
+
+def test_users_missing_from_the_replica_fall_back_to_the_primary(app, client, make_user):
+    # Registered after the last replication, so only the primary knows the user
+    _, newcomer = make_user("newcomer")
+    before = _routing_stats(app)
+
+    assert client.get("/api/v1/posts", headers=newcomer).status_code == 200
+
+    after = _routing_stats(app)
+    assert after["fallbacks"] - before["fallbacks"] == 1
+    assert after["primary_requests"] - before["primary_requests"] == 1
+
+
+def test_get_requests_cannot_write(app, client, make_user):
+    user_id, _ = make_user("author")
+
+    @app.route("/test/rename", methods=["GET", "POST"])
+    def rename():
+        db.session.execute(User.__table__.update().where(User.id == user_id).values(name="renamed"))
+        db.session.commit()
+        return ""
+
+    assert client.get("/test/rename").status_code == 500
+    with app.app_context():
+        assert db.session.get(User, user_id).name == "author"
+
+    # The connection isn't left read-only for the requests that follow
+    assert client.post("/test/rename").status_code == 200
+    with app.app_context():
+        assert db.session.get(User, user_id).name == "renamed"
@@ -0,0 +1,54 @@
+import random
+import threading
+from app import counters
+from app import db
+from app.models import Like
+
+
+USERS = 8
+THREADS_PER_USER = 3
+ROUNDS = 10
+
+
+def test_concurrent_likes_keep_the_counter_in_step(app, client, make_user):
+    _, author = make_user("author")
+    likers = [make_user(f"liker{i}")[1] for i in range(USERS)]
+    post_id = client.post("/api/v1/posts", json={"title": "viral", "body": "body"}, headers=author).json["id"]
+    url = f"/api/v1/users/me/likes/{post_id}"
+
+    statuses = []
+    errors = []
+    start = threading.Barrier(USERS * THREADS_PER_USER)
+
+    def hammer(headers, seed):
+        rng = random.Random(seed)
+        thread_client = app.test_client()
+        try:
+            start.wait()
+            for _ in range(ROUNDS):
+                if rng.random() < 0.6:
+                    statuses.append(thread_client.put(url, headers=headers).status_code)
+                else:
+                    statuses.append(thread_client.delete(url, headers=headers).status_code)
+        except Exception as e:
+            errors.append(e)
+
+    # Several threads per user, so the same like races against itself as well as against other users
+    threads = [
+        threading.Thread(target=hammer, args=(headers, i * THREADS_PER_USER + j))
+        for i, headers in enumerate(likers)
+        for j in range(THREADS_PER_USER)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(statuses) == USERS * THREADS_PER_USER * ROUNDS
+    assert set(statuses) <= {200, 201, 403, 404}
+
+    with app.app_context():
+        likes = Like.query.filter_by(post_id=post_id).count()
+        assert counters.like_totals([post_id]).get(post_id, 0) == likes
+        db.session.remove()
@@ -0,0 +1,39 @@
+from app import db
+from app.models import User
+from app.resources import users
+
+
+def _concurrent_update(user_id):
+    """Return a stand-in for ``counters.touch_liked_by`` that changes the user from another connection"""
+    def touch_liked_by(*_):
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.update().where(User.id == user_id).values(version=User.version + 1))
+    return touch_liked_by
+
+
+def test_overlapping_profile_updates_conflict_instead_of_failing(app, client, make_user, monkeypatch):
+    user_id, headers = make_user("alice")
+    monkeypatch.setattr(users.counters, "touch_liked_by", _concurrent_update(user_id))
+
+    response = client.put("/api/v1/users/me/facebook", json={"name": "renamed", "phone": "+84912345678"}, headers=headers)
+    assert response.status_code == 409
+
+    monkeypatch.undo()
+    response = client.put("/api/v1/users/me/facebook", json={"name": "renamed", "phone": "+84912345678"}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_profile_deletion_racing_an_update_conflicts(app, client, make_user, monkeypatch):
+    user_id, headers = make_user("alice")
+    update = _concurrent_update(user_id)
+    to_dict = users.FbProfile._FbProfile__to_dict
+
+    # The deletion serializes the profile after refreshing the user and before writing anything
+    def to_dict_after_update(self, fb_auth):
+        update(user_id)
+        return to_dict(self, fb_auth)
+    monkeypatch.setattr(users.FbProfile, "_FbProfile__to_dict", to_dict_after_update)
+
+    assert client.delete("/api/v1/users/me/facebook", headers=headers).status_code == 409
+    with app.app_context():
+        assert db.session.get(User, user_id).deleted_at is None
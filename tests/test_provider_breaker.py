@@ -0,0 +1,79 @@
+import importlib.util
+import os
+import statistics
+import threading
+import time
+from http.server import ThreadingHTTPServer
+import pytest
+from app.services import facebook_auth
+from app.services.circuit_breaker import CircuitBreaker
+
+
+STUB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "facebook_stub.py")
+TIMEOUT = 0.5
+LOGIN_THREADS = 8
+
+
+@pytest.fixture
+def hung_graph_api():
+    """Serve the Facebook stub with answers slower than the app waits for, and return its URL"""
+    spec = importlib.util.spec_from_file_location("facebook_stub", STUB)
+    stub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stub)
+
+    class HungHandler(stub.GraphHandler):
+        latency = 10 * TIMEOUT
+
+    server = ThreadingHTTPServer(("localhost", 0), HungHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _feed_latencies(client, headers, requests=20):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        assert client.get("/api/v1/posts", headers=headers).status_code == 200
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def test_feed_is_unaffected_while_facebook_is_down(app, client, make_user, hung_graph_api, monkeypatch):
+    app.config["FACEBOOK_GRAPH_URL"] = hung_graph_api
+    app.config["FACEBOOK_TIMEOUT"] = (TIMEOUT, TIMEOUT)
+    circuit = CircuitBreaker("facebook", "Facebook is unavailable")
+    circuit.min_calls = LOGIN_THREADS
+    monkeypatch.setattr(facebook_auth, "_breaker", circuit)
+
+    _, author = make_user("author")
+    for i in range(15):
+        client.post("/api/v1/posts", json={"title": f"post {i}", "body": "body"}, headers=author)
+    baseline = _feed_latencies(client, author)
+
+    logins = []
+
+    def login(token):
+        login_client = app.test_client()
+        for _ in range(3):
+            started = time.perf_counter()
+            status = login_client.post("/api/v1/auth/facebook", json={"accessToken": token}).status_code
+            logins.append((status, time.perf_counter() - started))
+
+    threads = [threading.Thread(target=login, args=(f"user{i}",)) for i in range(LOGIN_THREADS)]
+    for thread in threads:
+        thread.start()
+    during = _feed_latencies(client, author)
+    for thread in threads:
+        thread.join()
+
+    # Every login failed with a 503, the first ones after the timeout and the rest at once
+    assert {status for status, _ in logins} == {503}
+    assert circuit.stats()["state"] == "open"
+    assert circuit.rejected > 0
+    assert min(elapsed for _, elapsed in logins) < TIMEOUT / 5
+
+    # Feed requests never waited on Facebook
+    assert max(during) < TIMEOUT
+    assert statistics.median(during) < statistics.median(baseline) + TIMEOUT / 5
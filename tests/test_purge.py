@@ -0,0 +1,33 @@
+from app import db
+from app.models import Like
+from app.models import Post
+from app.models import User
+from app.purge import purger
+
+
+def test_purge_counts_the_rows_it_deleted(app, client, make_user):
+    author_id, author = make_user("author")
+    _, liker = make_user("liker")
+    post_id = client.post("/api/v1/posts", json={"title": "title", "body": "body"}, headers=author).json["id"]
+    assert client.put(f"/api/v1/users/me/likes/{post_id}", headers=liker).status_code == 201
+    assert client.delete("/api/v1/users/me/facebook", headers=author).status_code == 200
+
+    # Deleting an account doesn't start the background purge in tests
+    assert purger._thread is None
+
+    accounts, posts, likes = purger.accounts, purger.posts, purger.likes
+    with app.app_context():
+        assert purger.purge_all() == 1
+        assert purger.purge_all() == 0
+        assert (purger.accounts - accounts, purger.posts - posts, purger.likes - likes) == (1, 1, 1)
+        assert db.session.get(User, author_id) is None
+        assert Post.query.count() == 0
+        assert Like.query.count() == 0
+
+
+def test_overlapping_purges_skip(app):
+    skipped = purger.skipped
+    with app.app_context():
+        with purger._running:
+            assert purger.purge_all() is None
+    assert purger.skipped == skipped + 1
@@ -0,0 +1,55 @@
+def _post(client, headers, title):
+    response = client.post("/api/v1/posts", json={"title": title, "body": "body"}, headers=headers)
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def _get(client, url, headers):
+    def get():
+        assert client.get(url, headers=headers).status_code == 200
+    return get
+
+
+def _like(client, post_id, likers):
+    for headers in likers:
+        assert client.put(f"/api/v1/users/me/likes/{post_id}", headers=headers).status_code == 201
+
+
+def test_feed_pages_run_the_same_queries(client, make_user, count_queries):
+    _, author = make_user("author")
+    likers = [make_user(f"liker{i}")[1] for i in range(5)]
+    post_ids = [_post(client, author, f"post {i}") for i in range(12)]
+    for post_id in post_ids[:2]:
+        _like(client, post_id, likers[:1])
+    for post_id in post_ids[2:]:
+        _like(client, post_id, likers)
+
+    first = client.get("/api/v1/posts", headers=author)
+    next_url = f"/api/v1/posts?cursor={first.headers['X-Next-Cursor']}"
+
+    # A full page of posts with many likes each and a short page of posts with one like
+    assert count_queries(_get(client, "/api/v1/posts", author)) == count_queries(_get(client, next_url, author))
+
+
+def test_post_detail_and_likes_run_the_same_queries(client, make_user, count_queries):
+    _, author = make_user("author")
+    likers = [make_user(f"liker{i}")[1] for i in range(5)]
+    few, many = _post(client, author, "few likes"), _post(client, author, "many likes")
+    _like(client, few, likers[:1])
+    _like(client, many, likers)
+
+    for url in ("/api/v1/posts/{}", "/api/v1/posts/{}/likes"):
+        assert count_queries(_get(client, url.format(few), author)) == \
+            count_queries(_get(client, url.format(many), author))
+
+
+def test_profiles_run_the_same_queries(client, make_user, count_queries):
+    _, few = make_user("few")
+    _, many = make_user("many")
+    likers = [make_user(f"liker{i}")[1] for i in range(3)]
+    _like(client, _post(client, few, "only post"), likers[:1])
+    for i in range(12):
+        _like(client, _post(client, many, f"post {i}"), likers)
+
+    assert count_queries(_get(client, "/api/v1/users/me/facebook", few)) == \
+        count_queries(_get(client, "/api/v1/users/me/facebook", many))